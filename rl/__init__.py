@@ -0,0 +1,13 @@
+from .adapters import coin_flip_mdp, from_coin_flip_environment, from_maze_environment, maze_mdp
+from .mdp import TabularMDP
+from .segment_tree import MaxSegmentTree
+from .solvers import (
+    bfs_values,
+    gauss_seidel_value_iteration,
+    greedy_policy,
+    is_deterministic_unit_cost,
+    policy_iteration,
+    solve,
+    value_iteration
+)
+from .telemetry import NULL_TELEMETRY, NullTelemetry, Telemetry
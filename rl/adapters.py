@@ -0,0 +1,131 @@
+"""Build a TabularMDP from the environments in the scripts directory
+
+The adapters only rely on the plain attributes of the environments, so the scripts do not need to be importable.
+"""
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from .mdp import TabularMDP
+
+# the (y, x) increment of each maze action: left, up, right, down (same order as the action IDs in value_iter.py)
+MAZE_ACTION_INCREMENTS = ((0, -1), (-1, 0), (0, 1), (1, 0))
+
+
+def maze_mdp(maze, goal=None):
+    """Build the MDP of a maze
+
+    The states are the open cells in row-major order (the same order as `maze_utils.index_maze_cells`).
+    Every move costs a reward of -1, moving into a wall (or off the grid) leaves the agent in place,
+    and the goal cell is terminal.
+
+    Parameters
+    ----------
+    maze: numpy.ndarray
+        A 2D numpy array where 0 = open cell, 1 = wall
+    goal: tuple, optional
+        The (y, x) coordinates of the goal cell. Default is None (the last open cell in the last row).
+
+    Returns
+    -------
+    TabularMDP
+    """
+    maze = np.asarray(maze)
+    height, width = maze.shape
+    if goal is None:
+        goal = (height - 1, np.where(maze[-1] == 0)[0][-1])
+
+    # index the open cells on a grid (-1 for walls), padded with walls so that every neighbor lookup is in bounds
+    ys, xs = np.nonzero(maze == 0)
+    num_states = len(ys)
+    cell_index = np.full((height + 2, width + 2), -1, dtype=np.int64)
+    cell_index[ys + 1, xs + 1] = np.arange(num_states)
+
+    num_actions = len(MAZE_ACTION_INCREMENTS)
+    next_states = np.empty((num_states, num_actions), dtype=np.int64)
+    for action, (y_diff, x_diff) in enumerate(MAZE_ACTION_INCREMENTS):
+        neighbors = cell_index[ys + 1 + y_diff, xs + 1 + x_diff]
+        next_states[:, action] = np.where(neighbors >= 0, neighbors, np.arange(num_states))
+
+    terminal = np.zeros(num_states, dtype=bool)
+    goal_idx = cell_index[goal[0] + 1, goal[1] + 1]
+    terminal[goal_idx] = True
+    next_states[goal_idx] = goal_idx
+
+    rewards = np.full((num_states, num_actions), -1.0)
+    rewards[goal_idx] = 0
+
+    # exactly one next state per state-action pair
+    num_rows = num_states * num_actions
+    indptr = np.arange(num_rows + 1)
+    shape = (num_rows, num_states)
+    transitions = csr_matrix((np.ones(num_rows), next_states.ravel(), indptr), shape=shape)
+    rewards = csr_matrix((rewards.ravel(), next_states.ravel(), indptr), shape=shape)
+    return TabularMDP(transitions, rewards, num_actions, terminal=terminal)
+
+
+def coin_flip_mdp(p_head, goal=100):
+    """Build the MDP of the Gambler's Problem
+
+    The states are the capital {0, 1, ..., goal} and the actions are the stakes {0, 1, ..., goal // 2}.
+    Only the stakes {1, ..., min(s, goal - s)} are available in state s, the states 0 and goal are terminal,
+    and reaching the goal gives a reward of +1.
+
+    Parameters
+    ----------
+    p_head: float
+    goal: int, optional
+
+    Returns
+    -------
+    TabularMDP
+    """
+    num_states = goal + 1
+    num_actions = goal // 2 + 1
+
+    capital = np.arange(num_states).reshape(-1, 1)
+    stakes = np.arange(num_actions).reshape(1, -1)
+    valid_actions = (stakes >= 1) & (stakes <= np.minimum(capital, goal - capital))
+    states, actions = np.nonzero(valid_actions)
+
+    # two outcomes per valid state-action pair: heads (win the stake) then tails (lose the stake)
+    rows = np.repeat(states * num_actions + actions, 2)
+    next_states = np.stack([states + actions, states - actions], axis=1).ravel()
+    probs = np.tile([p_head, 1 - p_head], len(states))
+    rewards = (next_states == goal).astype(np.float64)
+
+    shape = (num_states * num_actions, num_states)
+    transitions = csr_matrix((probs, (rows, next_states)), shape=shape)
+    rewards = csr_matrix((rewards, (rows, next_states)), shape=shape)
+
+    terminal = np.zeros(num_states, dtype=bool)
+    terminal[[0, goal]] = True
+    return TabularMDP(transitions, rewards, num_actions, valid_actions=valid_actions, terminal=terminal)
+
+
+def from_maze_environment(maze_env):
+    """Build the MDP of a `value_iter.MazeEnvironment`
+
+    Parameters
+    ----------
+    maze_env: MazeEnvironment
+
+    Returns
+    -------
+    TabularMDP
+    """
+    return maze_mdp(maze_env.maze, maze_env.goal)
+
+
+def from_coin_flip_environment(coin_env):
+    """Build the MDP of a `CoinFlipEnvironment` from the Gambler's Problem
+
+    Parameters
+    ----------
+    coin_env: CoinFlipEnvironment
+
+    Returns
+    -------
+    TabularMDP
+    """
+    return coin_flip_mdp(coin_env.p_head, coin_env.goal)
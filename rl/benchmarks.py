@@ -0,0 +1,346 @@
+"""Benchmark suite for the maze, bandit, and gambler code with regression tracking
+
+Every benchmark is run once per parameter (e.g. the side length of the maze) and records two metrics:
+
+- time: the best wall time over the repeats (measured without tracemalloc, which slows down allocation)
+- peak_memory: the peak traced memory of one extra run under tracemalloc
+
+A run which takes longer than `max_repeat_time` seconds is not repeated (its single time is reported).
+
+The results are written to a JSON file and compared against a stored baseline of the same format.
+A metric regresses when it exceeds the baseline by more than its tolerance (e.g. 0.25 = 25% slower),
+in which case the command exits with a non-zero status.
+
+Examples
+--------
+rl-benchmarks --save-baseline                       # record a baseline with the default suite
+rl-benchmarks                                       # compare against it
+rl-benchmarks --suite full --config my_config.json  # maze sides up to 1000 with custom tolerances
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .experiments import check_scripts_dir, load_script
+from .telemetry import Telemetry
+
+# the parameters of each benchmark per suite: maze side lengths, (runs, steps) of the bandits
+# ((runs, steps, arms) of the many-armed bandit), and gambler goals
+# the dense adjacency matrix of `get_maze_adjacency` (used by Dijkstra) grows with the square of the open cells,
+# so those benchmarks stop at a much smaller side length than the rest
+# the maze generator takes between quadratic and cubic time in the side length and the sweeps of value iteration
+# grow with the length of the path, so the full suite takes roughly 15 to 20 minutes,
+# most of it generating 1000 x 1000 mazes (about 3 minutes each, vs. 8 seconds at 400 x 400)
+SUITES = {
+    'quick': {
+        'maze_generate': [20, 50, 100],
+        'maze_adjacency': [20, 50],
+        'dijkstra': [20, 50],
+        'maze_value_iteration': [20, 50, 100],
+        'maze_bfs': [20, 50, 100],
+        'bandit_stationary': [[100, 1000]],
+        'bandit_nonstationary': [[100, 1000]],
+        'bandit_many_armed': [[10, 1000, 10], [10, 1000, 100000]],
+        'gambler': [100, 1000]
+    },
+    'default': {
+        'maze_generate': [20, 50, 100, 200],
+        'maze_adjacency': [20, 50, 100],
+        'dijkstra': [20, 50, 100],
+        'maze_value_iteration': [20, 50, 100, 200],
+        'maze_bfs': [20, 50, 100, 200],
+        'bandit_stationary': [[200, 1000], [2000, 1000]],
+        'bandit_nonstationary': [[200, 1000], [200, 10000]],
+        'bandit_many_armed': [[20, 2000, 10], [20, 2000, 10000], [20, 2000, 1000000]],
+        'gambler': [100, 1000, 2000]
+    },
+    'full': {
+        'maze_generate': [20, 50, 100, 200, 500, 1000],
+        'maze_adjacency': [20, 50, 100, 150],
+        'dijkstra': [20, 50, 100, 150],
+        'maze_value_iteration': [20, 50, 100, 200, 500],
+        'maze_bfs': [20, 50, 100, 200, 500, 1000],
+        'bandit_stationary': [[2000, 1000], [2000, 10000]],
+        'bandit_nonstationary': [[2000, 1000], [2000, 10000]],
+        'bandit_many_armed': [[100, 10000, 10], [100, 10000, 10000], [100, 10000, 1000000]],
+        'gambler': [100, 1000, 5000]
+    }
+}
+
+DEFAULT_CONFIG = {
+    'repeat': 3,
+    'seed': 0,
+    'tolerance': {
+        'time': 0.25,
+        'peak_memory': 0.10
+    },
+    # time measurements below this many seconds are too noisy to flag as regressions
+    'min_time': 0.05,
+    # runs longer than this many seconds are not repeated
+    'max_repeat_time': 10.0
+}
+
+_mazes = {}
+
+
+def _maze(side, seed):
+    """Generate (and cache) the maze used by the maze benchmarks of a given side length and seed"""
+    if (side, seed) not in _mazes:
+        generate_maze = load_script('maze_solver/generate_maze.py', 'rl_scripts.generate_maze')
+        np.random.seed(seed)
+        random.seed(seed)
+        _mazes[side, seed] = generate_maze.MazeGenerator()(side, side)
+    return _mazes[side, seed]
+
+
+def setup_benchmark(name, param, seed):
+    """Prepare a benchmark (not timed)
+
+    Parameters
+    ----------
+    name: str
+    param: int or list[int]
+    seed: int
+
+    Returns
+    -------
+    callable
+        A function without arguments that runs the benchmark once
+    """
+    if name == 'maze_generate':
+        generate_maze = load_script('maze_solver/generate_maze.py', 'rl_scripts.generate_maze')
+        return lambda: generate_maze.MazeGenerator()(param, param)
+    if name == 'maze_adjacency':
+        maze_utils = load_script('maze_solver/maze_utils.py', 'rl_scripts.maze_utils')
+        maze = _maze(param, seed)
+        return lambda: maze_utils.get_maze_adjacency(maze)
+    if name == 'dijkstra':
+        dijkstra = load_script('maze_solver/dijkstra.py', 'rl_scripts.dijkstra')
+        maze = _maze(param, seed)
+        return lambda: dijkstra.dijkstra_solution(maze)
+    if name == 'maze_value_iteration':
+        value_iter = load_script('maze_solver/value_iter.py', 'rl_scripts.value_iter')
+        maze = _maze(param, seed)
+        return lambda: value_iter.value_iteration_solution(value_iter.MazeEnvironment(maze),
+                                                           method='value_iteration')
+    if name == 'maze_bfs':
+        value_iter = load_script('maze_solver/value_iter.py', 'rl_scripts.value_iter')
+        maze = _maze(param, seed)
+        return lambda: value_iter.value_iteration_solution(value_iter.MazeEnvironment(maze), method='bfs')
+    if name == 'bandit_stationary':
+        bandit = load_script('sutton_exercises/ten_armed_testbed/stationary_example.py',
+                             'rl_scripts.stationary_example')
+        n_runs, n_steps = param
+        return lambda: bandit.run_ten_armed_testbed(n_runs, n_steps, eps=0.1)
+    if name == 'bandit_nonstationary':
+        bandit = load_script('sutton_exercises/ten_armed_testbed/nonstationary_example.py',
+                             'rl_scripts.nonstationary_example')
+        n_runs, n_steps = param
+        return lambda: bandit.run_ten_armed_testbed(n_runs, n_steps, eps=0.1, alpha=0.1)
+    if name == 'bandit_many_armed':
+        bandit = load_script('sutton_exercises/ten_armed_testbed/stationary_example.py',
+                             'rl_scripts.stationary_example')
+        n_runs, n_steps, n_arms = param
+        return lambda: bandit.run_many_armed_testbed(n_runs, n_steps, 0.1, n_arms)
+    if name == 'gambler':
+        gambler = load_script('sutton_exercises/gambler_problem/main.py', 'rl_scripts.gambler_main')
+        return lambda: gambler.value_iteration_solution(gambler.CoinFlipEnvironment(0.4, param))
+    raise ValueError(f'Unknown benchmark: {name}')
+
+
+def benchmark_id(name, param):
+    """The key of a benchmark in the results file, e.g. 'dijkstra[100]' or 'bandit_stationary[2000x1000]'"""
+    if isinstance(param, (list, tuple)):
+        param = 'x'.join(str(p) for p in param)
+    return f'{name}[{param}]'
+
+
+def run_benchmark(name, param, repeat=3, seed=0, max_repeat_time=float('inf')):
+    """Run a single benchmark
+
+    Parameters
+    ----------
+    name: str
+    param: int or list[int]
+    repeat: int, optional
+        The number of timed runs
+    seed: int, optional
+    max_repeat_time: float, optional
+        Stop repeating once a run takes longer than this many seconds
+
+    Returns
+    -------
+    dict[str, float]
+        The best wall time (seconds) and the peak traced memory (bytes)
+    """
+    run = setup_benchmark(name, param, seed)
+
+    times = []
+    for _ in range(repeat):
+        np.random.seed(seed)
+        random.seed(seed)
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+        if times[-1] > max_repeat_time:
+            break
+
+    np.random.seed(seed)
+    random.seed(seed)
+    telemetry = Telemetry()
+    with telemetry.phase(name):
+        run()
+    return {'time': min(times), 'peak_memory': telemetry.records[-1]['peak_memory']}
+
+
+def run_suite(suite, repeat=3, seed=0, only=None, max_repeat_time=float('inf'), log=sys.stderr):
+    """Run every benchmark of a suite
+
+    Parameters
+    ----------
+    suite: dict[str, list]
+        A mapping from benchmark name to its parameters (see `SUITES`)
+    repeat: int, optional
+    seed: int, optional
+    only: list[str], optional
+        Only run the benchmarks with these names. Default is None (run all of them).
+    max_repeat_time: float, optional
+        Stop repeating a benchmark once a run takes longer than this many seconds
+    log: file, optional
+
+    Returns
+    -------
+    dict[str, dict[str, float]]
+    """
+    results = {}
+    for name, params in suite.items():
+        if only and name not in only:
+            continue
+        for param in params:
+            key = benchmark_id(name, param)
+            results[key] = run_benchmark(name, param, repeat=repeat, seed=seed, max_repeat_time=max_repeat_time)
+            print(f'{key:<40} {results[key]["time"]:>10.4f} s {results[key]["peak_memory"] / 2 ** 20:>10.2f} MiB',
+                  file=log)
+    return results
+
+
+def compare(results, baseline, tolerance, min_time=0.0):
+    """Compare benchmark results against a baseline
+
+    Parameters
+    ----------
+    results: dict[str, dict[str, float]]
+    baseline: dict[str, dict[str, float]]
+    tolerance: dict[str, float]
+        The allowed relative increase of each tracked metric (metrics without a tolerance are not tracked)
+    min_time: float, optional
+        Ignore time regressions when both measurements are below this many seconds
+
+    Returns
+    -------
+    list[dict]
+        One entry per regressed metric with the benchmark, metric, baseline, current value, and ratio
+    """
+    regressions = []
+    for key, metrics in results.items():
+        if key not in baseline:
+            continue
+        for metric, allowed in tolerance.items():
+            if metric not in metrics or metric not in baseline[key]:
+                continue
+            old, new = baseline[key][metric], metrics[metric]
+            if metric == 'time' and max(old, new) < min_time:
+                continue
+            ratio = new / old if old > 0 else float('inf')
+            if ratio > 1 + allowed:
+                regressions.append({'benchmark': key, 'metric': metric, 'baseline': old, 'current': new,
+                                    'ratio': ratio})
+    return regressions
+
+
+def load_config(path=None):
+    """Load the benchmark configuration, overriding the defaults with a JSON file"""
+    config = json.loads(json.dumps(DEFAULT_CONFIG))
+    if path is not None:
+        with open(path) as file:
+            overrides = json.load(file)
+        config['tolerance'].update(overrides.pop('tolerance', {}))
+        config.update(overrides)
+    return config
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='rl-benchmarks', description='Run the benchmark suite')
+    parser.add_argument('--suite', choices=list(SUITES), default='default')
+    parser.add_argument('--only', nargs='+', help='Only run these benchmarks (e.g. dijkstra gambler)')
+    parser.add_argument('--config', type=Path,
+                        help='JSON file overriding the repeat count, seed, tolerances, min_time, max_repeat_time or '
+                             'suite parameters')
+    parser.add_argument('--results', type=Path, default=Path('benchmark_results.json'),
+                        help='Where to write the results')
+    parser.add_argument('--baseline', type=Path, default=Path('benchmark_baseline.json'),
+                        help='The baseline to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='Store the results as the new baseline')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        check_scripts_dir()
+    except FileNotFoundError as e:
+        print(f'rl-benchmarks: {e}', file=sys.stderr)
+        return 2
+    config = load_config(args.config)
+    suite = config.get('suites', {}).get(args.suite, SUITES[args.suite])
+
+    # keep the bandit progress bars out of the benchmark output
+    os.environ.setdefault('TQDM_DISABLE', '1')
+
+    results = run_suite(suite, repeat=config['repeat'], seed=config['seed'], only=args.only,
+                        max_repeat_time=config['max_repeat_time'])
+    output = {
+        'meta': {
+            'suite': args.suite,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'processor': platform.processor()
+        },
+        'results': results
+    }
+    with open(args.results, 'w') as file:
+        json.dump(output, file, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(output, file, indent=2)
+        print(f'Saved the baseline to {args.baseline}', file=sys.stderr)
+        return 0
+
+    if not args.baseline.is_file():
+        print(f'No baseline found at {args.baseline} (create one with --save-baseline)', file=sys.stderr)
+        return 0
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)['results']
+    regressions = compare(results, baseline, config['tolerance'], config['min_time'])
+    for r in regressions:
+        print(f'REGRESSION {r["benchmark"]} {r["metric"]}: {r["baseline"]:.4g} -> {r["current"]:.4g} '
+              f'({r["ratio"]:.2f}x, tolerance {config["tolerance"][r["metric"]]:.0%})', file=sys.stderr)
+    if regressions:
+        return 1
+    print(f'No regressions against {args.baseline}', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
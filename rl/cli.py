@@ -0,0 +1,133 @@
+"""Command line entry point for running the experiments headless (e.g. on batch nodes)
+
+Examples
+--------
+rl-experiments maze --height 100 --width 100 --seed 0
+rl-experiments maze --height 200 --width 200 --render --frames frames --frame-every 10 --scale 2
+rl-experiments bandit --kind nonstationary --runs 500 --steps 10000 --plot
+rl-experiments bandit --many-armed --arms 1000000 --runs 20 --steps 10000
+rl-experiments gambler --p-head 0.25 0.4 0.55 --telemetry
+
+Every run writes <name>.npz (arrays) and <name>.json (summary) to the output directory,
+along with <name>.png when --plot is given and <name>_telemetry.jsonl when --telemetry is given.
+The maze experiment can also render <name>_render.png and value iteration progress frames without matplotlib.
+"""
+
+import argparse
+import json
+import sys
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+
+from . import experiments
+from .telemetry import Telemetry
+
+# the ten-armed testbeds do O(n_arms) work per step (the stationary one pre-samples an (n_steps, n_arms) reward
+# table per run), so more arms than this need --many-armed
+MAX_DENSE_ARMS = 1000
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='rl-experiments', description='Run the rl-playground experiments headless')
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--output-dir', type=Path, default=Path('results'), help='Where to write the results')
+    common.add_argument('--name', help='The file name prefix of the results (default is the experiment name)')
+    common.add_argument('--seed', type=int, help='Seed for the random number generators')
+    common.add_argument('--plot', action='store_true', help='Also save a PNG plot (imports matplotlib)')
+    common.add_argument('--telemetry', action='store_true', help='Also save the telemetry records as JSON lines')
+    subparsers = parser.add_subparsers(dest='experiment', required=True)
+
+    maze = subparsers.add_parser('maze', parents=[common], help='Generate and solve a random maze')
+    maze.add_argument('--height', type=int, default=40)
+    maze.add_argument('--width', type=int, default=40)
+    maze.add_argument('--solver', choices=['dijkstra', 'value_iteration', 'both'], default='both')
+    maze.add_argument('--render', action='store_true', help='Save the solutions as a PNG without matplotlib')
+    maze.add_argument('--frames', type=Path, help='Stream value iteration progress frames to this directory')
+    maze.add_argument('--frame-every', type=int, default=1, help='Only save the frame of every n-th sweep')
+    maze.add_argument('--scale', type=int, default=1, help='Pixels per maze cell in the rendered images')
+
+    bandit = subparsers.add_parser('bandit', parents=[common], help='Run a ten-armed bandit testbed')
+    bandit.add_argument('--kind', choices=['stationary', 'nonstationary'], default='stationary')
+    bandit.add_argument('--runs', type=int, default=2000)
+    bandit.add_argument('--steps', type=int, default=1000)
+    bandit.add_argument('--arms', type=int, default=10,
+                        help=f'The number of arms (more than {MAX_DENSE_ARMS} requires --many-armed)')
+    bandit.add_argument('--many-armed', action='store_true',
+                        help='Keep the estimates in a segment tree so the step cost does not grow with --arms')
+
+    gambler = subparsers.add_parser('gambler', parents=[common], help="Solve the Gambler's Problem")
+    gambler.add_argument('--p-head', type=float, nargs='+', default=[0.25, 0.4, 0.55])
+    gambler.add_argument('--goal', type=int, default=100)
+    return parser
+
+
+def run(args):
+    """Run the experiment selected by the parsed arguments
+
+    Returns
+    -------
+    dict[str, numpy.ndarray], dict, callable, Telemetry
+        The arrays and summary of the experiment, a function that plots the arrays, and the telemetry (or None)
+    """
+    telemetry = Telemetry() if args.telemetry else None
+    experiments.seed_everything(args.seed)
+
+    if args.experiment == 'maze':
+        solvers = ('dijkstra', 'value_iteration') if args.solver == 'both' else (args.solver,)
+        arrays, summary = experiments.run_maze(args.height, args.width, solvers, telemetry=telemetry,
+                                               frames_dir=args.frames, frame_every=args.frame_every,
+                                               frame_scale=args.scale)
+        plot = experiments.plot_maze_solutions
+    elif args.experiment == 'bandit':
+        arrays, summary = experiments.run_bandit(args.kind, args.runs, args.steps, telemetry=telemetry,
+                                                 n_arms=args.arms, many_armed=args.many_armed)
+        plot = partial(experiments.plot_bandit, kind=args.kind)
+    else:
+        arrays, summary = experiments.run_gambler(args.p_head, args.goal, telemetry=telemetry)
+        plot = partial(experiments.plot_gambler, goal=args.goal)
+
+    summary['seed'] = args.seed
+    return arrays, summary, plot, telemetry
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.experiment == 'bandit' and args.arms > MAX_DENSE_ARMS and not args.many_armed:
+        parser.error(f'--arms {args.arms} needs --many-armed (the ten-armed testbeds do O(n_arms) work per step, '
+                     f'and the stationary one keeps an (n_steps, n_arms) reward table per run)')
+    try:
+        experiments.check_scripts_dir()
+    except FileNotFoundError as e:
+        print(f'rl-experiments: {e}', file=sys.stderr)
+        return 2
+    arrays, summary, plot, telemetry = run(args)
+
+    name = args.name or (f'bandit_{args.kind}' if args.experiment == 'bandit' else args.experiment)
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    output = args.output_dir / name
+
+    np.savez_compressed(args.output_dir / f'{name}.npz', **arrays)
+    with open(args.output_dir / f'{name}.json', 'w') as file:
+        json.dump(summary, file, indent=2)
+    if telemetry is not None:
+        telemetry.to_jsonl(args.output_dir / f'{name}_telemetry.jsonl')
+    if getattr(args, 'render', False):
+        maze_utils = experiments.load_script('maze_solver/maze_utils.py', 'rl_scripts.maze_utils')
+        maze_utils.write_png(args.output_dir / f'{name}_render.png',
+                             experiments.render_maze_solutions(arrays, args.scale))
+    if args.plot:
+        # select a non-interactive backend before pyplot is imported so no display is needed
+        import matplotlib
+        matplotlib.use('Agg')
+        fig = plot(arrays)
+        fig.savefig(args.output_dir / f'{name}.png')
+
+    print(f'Wrote results to {output}.*', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,285 @@
+"""Headless versions of the experiments in the scripts directory
+
+The scripts are not part of the installed package, so they are loaded from the source tree
+(i.e. the package must be installed in development mode with `pip install -e .`).
+Set the RL_SCRIPTS_DIR environment variable to load them from somewhere else (e.g. after a regular `pip install`).
+The scripts are registered under the `rl_scripts.` prefix so that they never shadow other modules (e.g. `main`).
+
+Every experiment returns a dictionary of numpy arrays (saved as an .npz file) and a JSON-serializable summary.
+Plotting is kept in separate functions which import matplotlib only when they are called.
+"""
+
+import importlib.util
+import os
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from .telemetry import NULL_TELEMETRY, Telemetry
+
+SCRIPTS_DIR = Path(os.environ.get('RL_SCRIPTS_DIR', Path(__file__).resolve().parent.parent / 'scripts'))
+
+
+def check_scripts_dir():
+    """Raise a FileNotFoundError which explains how to fix the setup if the scripts directory cannot be found"""
+    if not (SCRIPTS_DIR / 'maze_solver').is_dir():
+        raise FileNotFoundError(
+            f'The experiment scripts were not found in {SCRIPTS_DIR}. They are not part of the installed package: '
+            'install it from a source checkout with `pip install -e .`, '
+            'or set RL_SCRIPTS_DIR to the scripts directory of a checkout.'
+        )
+
+
+def load_script(relative_path, module_name):
+    """Import a module from the scripts directory
+
+    The directory of the script is added to `sys.path` while the module is executed so that its sibling imports
+    (e.g. `from generate_maze import MazeGenerator`) resolve, and the module is registered under `module_name`
+    so that it is only loaded once.
+
+    Parameters
+    ----------
+    relative_path: str
+        The path of the script relative to the scripts directory
+    module_name: str
+        The name to register the module under in `sys.modules` (e.g. 'rl_scripts.gambler_main')
+
+    Returns
+    -------
+    module
+    """
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+
+    path = SCRIPTS_DIR / relative_path
+    if not path.is_file():
+        check_scripts_dir()
+        raise FileNotFoundError(f'Could not find {path}')
+
+    script_dir = str(path.parent)
+    added_to_path = script_dir not in sys.path
+    if added_to_path:
+        sys.path.insert(0, script_dir)
+
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[module_name]
+        raise
+    finally:
+        if added_to_path:
+            sys.path.remove(script_dir)
+    return module
+
+
+def seed_everything(seed):
+    """Seed both the numpy and python random number generators (the maze generator uses both)"""
+    if seed is not None:
+        np.random.seed(seed)
+        random.seed(seed)
+
+
+def run_maze(height=40, width=40, solvers=('dijkstra', 'value_iteration'), telemetry=None, frames_dir=None,
+             frame_every=1, frame_scale=1):
+    """Generate a random maze and solve it
+
+    Parameters
+    ----------
+    height: int, optional
+    width: int, optional
+    solvers: tuple[str], optional
+        Any of 'dijkstra' and 'value_iteration'
+    telemetry: Telemetry, optional
+    frames_dir: str or pathlib.Path, optional
+        Stream the value function of every `frame_every` value iteration sweeps to PNG frames in this directory
+    frame_every: int, optional
+    frame_scale: int, optional
+        Enlarge each maze cell to a frame_scale x frame_scale block of pixels in the frames
+
+    Returns
+    -------
+    dict[str, numpy.ndarray], dict
+        The maze and the solution paths as (length, 2) arrays of (y, x) coordinates, and a summary of the path lengths
+    """
+    telemetry = telemetry or NULL_TELEMETRY
+    generate_maze = load_script('maze_solver/generate_maze.py', 'rl_scripts.generate_maze')
+
+    with telemetry.phase('generate'):
+        maze = generate_maze.MazeGenerator()(height, width)
+
+    solutions = {}
+    if 'dijkstra' in solvers:
+        dijkstra = load_script('maze_solver/dijkstra.py', 'rl_scripts.dijkstra')
+        with telemetry.phase('dijkstra'):
+            solutions['dijkstra'] = dijkstra.dijkstra_solution(maze)
+    if 'value_iteration' in solvers:
+        value_iter = load_script('maze_solver/value_iter.py', 'rl_scripts.value_iter')
+        maze_env = value_iter.MazeEnvironment(maze)
+        # force value iteration (not the BFS fast path), which is also what the progress frames need
+        if frames_dir is None:
+            solutions['value_iteration'], *_ = value_iter.value_iteration_solution(
+                maze_env, method='value_iteration', telemetry=telemetry)
+        else:
+            maze_utils = load_script('maze_solver/maze_utils.py', 'rl_scripts.maze_utils')
+            frame_writer = maze_utils.ValueFrameWriter(maze, frames_dir, every=frame_every, scale=frame_scale)
+            if telemetry is NULL_TELEMETRY:
+                telemetry = Telemetry(trace_memory=False)
+            telemetry.sweep_callbacks.append(frame_writer)
+            try:
+                solutions['value_iteration'], *_ = value_iter.value_iteration_solution(
+                    maze_env, method='value_iteration', telemetry=telemetry)
+            finally:
+                telemetry.sweep_callbacks.remove(frame_writer)
+
+    arrays = {'maze': maze}
+    arrays.update({f'{name}_path': np.array(path, dtype=np.int64) for name, path in solutions.items()})
+    path_lengths = {name: len(path) for name, path in solutions.items()}
+    summary = {
+        'height': height,
+        'width': width,
+        'path_lengths': path_lengths,
+        'lengths_agree': len(set(path_lengths.values())) <= 1
+    }
+    return arrays, summary
+
+
+def plot_maze_solutions(arrays):
+    """Plot every solution of a maze experiment side by side
+
+    Returns
+    -------
+    matplotlib.pyplot.Figure
+    """
+    import matplotlib.pyplot as plt
+
+    maze_utils = load_script('maze_solver/maze_utils.py', 'rl_scripts.maze_utils')
+    paths = {name[:-len('_path')]: path for name, path in arrays.items() if name.endswith('_path')}
+    fig, axes = plt.subplots(1, max(len(paths), 1), squeeze=False)
+    if not paths:
+        maze_utils.plot_maze(axes[0, 0], arrays['maze'])
+    for ax, (name, path) in zip(axes[0], paths.items()):
+        maze_utils.plot_maze(ax, arrays['maze'], [tuple(cell) for cell in path])
+        ax.set_title(f'{name.replace("_", " ").title()} Solution')
+    return fig
+
+
+def render_maze_solutions(arrays, scale=1):
+    """Render every solution of a maze experiment side by side as an RGB image (without matplotlib)
+
+    Returns
+    -------
+    numpy.ndarray
+    """
+    maze_utils = load_script('maze_solver/maze_utils.py', 'rl_scripts.maze_utils')
+    paths = [path for name, path in arrays.items() if name.endswith('_path')] or [None]
+    sheet = maze_utils.render_sprite_sheet([arrays['maze']] * len(paths), paths, n_cols=len(paths))
+    return maze_utils.upscale(sheet, scale)
+
+
+def _bandit_script(kind):
+    if kind == 'stationary':
+        return load_script('sutton_exercises/ten_armed_testbed/stationary_example.py', 'rl_scripts.stationary_example')
+    if kind == 'nonstationary':
+        return load_script('sutton_exercises/ten_armed_testbed/nonstationary_example.py',
+                           'rl_scripts.nonstationary_example')
+    raise ValueError(f'Unknown bandit testbed: {kind}')
+
+
+def run_bandit(kind='stationary', n_runs=2000, n_steps=1000, telemetry=None, n_arms=10, many_armed=False):
+    """Run one of the ten-armed testbeds
+
+    Parameters
+    ----------
+    kind: str, optional
+        Either 'stationary' (Figure 2.2) or 'nonstationary' (exercise 2.5)
+    n_runs: int, optional
+    n_steps: int, optional
+    telemetry: Telemetry, optional
+    n_arms: int, optional
+    many_armed: bool, optional
+        Use the many-armed testbed, whose step cost does not grow with the number of arms
+
+    Returns
+    -------
+    dict[str, numpy.ndarray], dict
+        The mean reward and fraction of optimal actions per step for every setting, and a summary of the last step
+    """
+    telemetry = telemetry or NULL_TELEMETRY
+    bandit = _bandit_script(kind)
+    with telemetry.phase('rollout', runs=n_runs, steps=n_steps):
+        results = bandit.run_experiments(n_runs, n_steps, telemetry=telemetry, n_arms=n_arms, many_armed=many_armed)
+    mean_rewards, optimal_fractions = bandit.summarize_results(results)
+
+    arrays = {}
+    summary = {'kind': kind, 'n_runs': n_runs, 'n_steps': n_steps, 'n_arms': n_arms, 'settings': {}}
+    for setting in results:
+        arrays[f'{setting}_mean_reward'] = mean_rewards[setting]
+        arrays[f'{setting}_optimal_fraction'] = optimal_fractions[setting]
+        summary['settings'][str(setting)] = {
+            'final_mean_reward': float(mean_rewards[setting][-1]),
+            'final_optimal_fraction': float(optimal_fractions[setting][-1])
+        }
+    return arrays, summary
+
+
+def plot_bandit(arrays, kind='stationary'):
+    """Plot a bandit experiment with the `plot_results` function (labels and colors) of its testbed script
+
+    Returns
+    -------
+    matplotlib.pyplot.Figure
+    """
+    bandit = _bandit_script(kind)
+    # the arrays are named after str(setting), e.g. '0.1_mean_reward' or 'None_mean_reward'
+    settings = [setting for setting, *_ in (bandit.EPS_SETTINGS if kind == 'stationary' else bandit.ALPHA_SETTINGS)]
+    return bandit.plot_results(
+        {setting: arrays[f'{setting}_mean_reward'] for setting in settings},
+        {setting: arrays[f'{setting}_optimal_fraction'] for setting in settings}
+    )
+
+
+def run_gambler(p_heads=(0.25, 0.4, 0.55), goal=100, telemetry=None):
+    """Solve the Gambler's Problem for several probabilities of heads
+
+    Parameters
+    ----------
+    p_heads: tuple[float], optional
+    goal: int, optional
+    telemetry: Telemetry, optional
+
+    Returns
+    -------
+    dict[str, numpy.ndarray], dict
+        The stakes (indexed by capital) and value function of every P_head, and a summary of the policies
+    """
+    gambler = load_script('sutton_exercises/gambler_problem/main.py', 'rl_scripts.gambler_main')
+
+    arrays = {}
+    summary = {'goal': goal, 'policies': {}}
+    for p_head in p_heads:
+        policy_fn, value_fn = gambler.value_iteration_solution(gambler.CoinFlipEnvironment(p_head, goal),
+                                                               telemetry=telemetry)
+        stakes = np.zeros(goal + 1, dtype=np.int64)
+        stakes[list(policy_fn)] = list(policy_fn.values())
+        arrays[f'{p_head}_stakes'] = stakes
+        arrays[f'{p_head}_values'] = value_fn
+        summary['policies'][str(p_head)] = stakes[1:-1].tolist()
+    return arrays, summary
+
+
+def plot_gambler(arrays, goal=100):
+    """Plot the policies and value functions of a gambler experiment
+
+    Returns
+    -------
+    matplotlib.pyplot.Figure
+    """
+    gambler = load_script('sutton_exercises/gambler_problem/main.py', 'rl_scripts.gambler_main')
+    p_heads = [name[:-len('_stakes')] for name in arrays if name.endswith('_stakes')]
+    solutions = {float(p): (arrays[f'{p}_stakes'], arrays[f'{p}_values']) for p in p_heads}
+    return gambler.plot_solutions(solutions, goal)
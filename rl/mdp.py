@@ -0,0 +1,124 @@
+"""A sparse representation of a finite (tabular) Markov decision process
+
+The dynamics are stored as two CSR matrices with one row per state-action pair and one column per next state.
+The row of the pair (s, a) is s * num_actions + a, so the rows of a contiguous block of states are also contiguous.
+
+- transitions[s * A + a, s'] = p(s' | s, a)
+- rewards[s * A + a, s'] = r(s, a, s'), stored with the same sparsity pattern as the transitions
+"""
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+
+class TabularMDP:
+    """Finite MDP with sparse transition probabilities and rewards
+
+    Parameters
+    ----------
+    transitions: scipy.sparse.csr_matrix
+        A (num_states * num_actions, num_states) matrix of transition probabilities
+    rewards: scipy.sparse.csr_matrix
+        A (num_states * num_actions, num_states) matrix of transition rewards
+    num_actions: int
+        The (maximum) number of actions available in each state
+    valid_actions: numpy.ndarray, optional
+        A (num_states, num_actions) boolean mask of the actions available in each state.
+        Default is None (an action is available if its row of the transition matrix is non-empty).
+    terminal: numpy.ndarray, optional
+        A boolean mask of the terminal states, whose value is fixed at zero. Default is None (no terminal states).
+    """
+    def __init__(self, transitions, rewards, num_actions, valid_actions=None, terminal=None):
+        self.transitions = csr_matrix(transitions)
+        self.rewards = csr_matrix(rewards)
+        self.num_actions = num_actions
+
+        num_rows, self.num_states = self.transitions.shape
+        assert num_rows == self.num_states * self.num_actions, 'Expected one row per state-action pair!'
+        assert self.rewards.shape == self.transitions.shape, 'Rewards and transitions must have the same shape!'
+
+        if valid_actions is None:
+            valid_actions = np.diff(self.transitions.indptr).reshape(self.num_states, self.num_actions) > 0
+        self.valid_actions = np.asarray(valid_actions, dtype=bool)
+
+        if terminal is None:
+            terminal = np.zeros(self.num_states, dtype=bool)
+        self.terminal = np.asarray(terminal, dtype=bool)
+
+        # the expected reward of each state-action pair: sum over s' of p(s' | s, a) * r(s, a, s')
+        self.expected_rewards = np.asarray(self.transitions.multiply(self.rewards).sum(axis=1)).ravel()
+
+    @property
+    def num_transitions(self):
+        """The number of stored (s, a, s') transitions"""
+        return self.transitions.nnz
+
+    def action_values(self, values, gamma=1.0, states=None):
+        """Calculate the action-values given the current value function
+
+        Parameters
+        ----------
+        values: numpy.ndarray
+        gamma: float, optional
+        states: slice, optional
+            A contiguous block of states to calculate the action-values for. Default is None (all states).
+
+        Returns
+        -------
+        numpy.ndarray
+            A (num_states, num_actions) array of action-values (-inf for unavailable actions)
+        """
+        if states is None:
+            states = slice(0, self.num_states)
+        rows = slice(states.start * self.num_actions, states.stop * self.num_actions)
+        q = self.expected_rewards[rows] + gamma * (self.transitions[rows] @ values)
+        q = q.reshape(-1, self.num_actions)
+        q[~self.valid_actions[states]] = -np.inf
+        return q
+
+    def backup(self, values, gamma=1.0, states=None):
+        """Apply the Bellman optimality backup to the value function
+
+        Parameters
+        ----------
+        values: numpy.ndarray
+        gamma: float, optional
+        states: slice, optional
+            A contiguous block of states to back up. Default is None (all states).
+
+        Returns
+        -------
+        numpy.ndarray
+            The backed up values of the selected states
+        """
+        if states is None:
+            states = slice(0, self.num_states)
+        q = self.action_values(values, gamma, states)
+        new_values = q.max(axis=1)
+        new_values[self.terminal[states] | ~self.valid_actions[states].any(axis=1)] = 0
+        return new_values
+
+    def policy_model(self, policy):
+        """Isolate the transition matrix and expected rewards under a deterministic policy
+
+        Parameters
+        ----------
+        policy: numpy.ndarray
+            The action taken in each state
+
+        Returns
+        -------
+        scipy.sparse.csr_matrix, numpy.ndarray
+            The (num_states, num_states) transition matrix and the expected reward of each state
+        """
+        rows = np.arange(self.num_states) * self.num_actions + policy
+        policy_transitions = self.transitions[rows]
+        policy_rewards = self.expected_rewards[rows]
+
+        # terminal states (and states without actions) neither transition nor collect rewards
+        absorbing = self.terminal | ~self.valid_actions.any(axis=1)
+        if absorbing.any():
+            keep = csr_matrix((~absorbing).astype(np.float64).reshape(-1, 1))
+            policy_transitions = csr_matrix(policy_transitions.multiply(keep))
+            policy_rewards = np.where(absorbing, 0, policy_rewards)
+        return policy_transitions, policy_rewards
@@ -0,0 +1,74 @@
+"""An indexed max structure for action-value estimates with many actions"""
+
+import numpy as np
+
+
+class MaxSegmentTree:
+    """A segment tree over an array supporting O(log K) point updates and O(1) argmax
+
+    Ties are broken in favor of the lowest index (the same as `numpy.argmax`).
+    The tree is stored in python lists because single-element access is much faster than on numpy arrays.
+
+    Parameters
+    ----------
+    values: numpy.ndarray
+        The initial values
+    """
+    def __init__(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        self.size = len(values)
+        self._leaves = 1 << max(self.size - 1, 0).bit_length()
+
+        # node i has the children 2i and 2i + 1, the leaves start at index `_leaves`
+        tree_values = np.full(2 * self._leaves, -np.inf)
+        tree_index = np.zeros(2 * self._leaves, dtype=np.int64)
+        tree_values[self._leaves:self._leaves + self.size] = values
+        tree_index[self._leaves:] = np.arange(self._leaves)
+
+        # build the tree one level at a time (bottom-up)
+        level = self._leaves
+        while level > 1:
+            parents = np.arange(level // 2, level)
+            left, right = 2 * parents, 2 * parents + 1
+            take_left = tree_values[left] >= tree_values[right]
+            tree_values[parents] = np.where(take_left, tree_values[left], tree_values[right])
+            tree_index[parents] = np.where(take_left, tree_index[left], tree_index[right])
+            level //= 2
+
+        self._values = tree_values.tolist()
+        self._index = tree_index.tolist()
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        return self._values[self._leaves + i]
+
+    def update(self, i, value):
+        """Set the value at index i"""
+        values = self._values
+        index = self._index
+        node = self._leaves + i
+        values[node] = value
+        node //= 2
+        while node >= 1:
+            left = 2 * node
+            if values[left] >= values[left + 1]:
+                values[node] = values[left]
+                index[node] = index[left]
+            else:
+                values[node] = values[left + 1]
+                index[node] = index[left + 1]
+            node //= 2
+
+    def argmax(self):
+        """The index of the largest value"""
+        return self._index[1]
+
+    def max(self):
+        """The largest value"""
+        return self._values[1]
+
+    def to_array(self):
+        """The values as a numpy array"""
+        return np.array(self._values[self._leaves:self._leaves + self.size])
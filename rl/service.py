@@ -0,0 +1,380 @@
+"""A local maze-solving service on a Unix socket
+
+Other processes send mazes in a compact binary form and get back the shortest path from the entrance
+(the first open cell in row-major order) to the goal (the last open cell of the last row).
+
+- The solves run in a pool of worker processes which are warmed up (imports and a first solve) at startup
+- Identical requests which arrive while the maze is being solved share a single solve
+- Solved mazes are cached in an LRU cache keyed by a hash of the request
+- A stats request returns the latency percentiles, queue depth, and cache counters as JSON
+
+Protocol (all integers are little-endian)
+-----------------------------------------
+Request:  kind (1 byte: b'S' = solve, b'T' = stats), height (uint32), width (uint32),
+          followed for a solve by the maze as packed bits (numpy.packbits of maze != 0, ceil(height * width / 8) bytes)
+Response: status (1 byte: b'O' = ok, b'E' = error), payload length (uint32), payload
+          (solve: the path as uint32 flat cell indices y * width + x, stats: JSON, error: the message in UTF-8)
+
+A connection may send any number of requests, one after another.
+A solve request with more than `max_cells` cells is answered with an error and the connection is closed.
+
+Examples
+--------
+rl-maze-service --socket /tmp/rl-maze.sock --workers 4
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import struct
+import sys
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .adapters import maze_mdp
+from .solvers import greedy_policy, solve
+
+REQUEST_HEADER = struct.Struct('<cII')
+RESPONSE_HEADER = struct.Struct('<cI')
+
+SOLVE = b'S'
+STATS = b'T'
+OK = b'O'
+ERROR = b'E'
+
+DEFAULT_SOCKET = '/tmp/rl-maze.sock'
+DEFAULT_MAX_CELLS = 2 ** 24  # e.g. a 4096 x 4096 maze (2 MiB of packed bits)
+
+
+def encode_maze(maze):
+    """Encode a maze as a solve request
+
+    Parameters
+    ----------
+    maze: numpy.ndarray
+        A 2D numpy array where 0 = open cell, 1 = wall
+
+    Returns
+    -------
+    bytes
+    """
+    height, width = maze.shape
+    return REQUEST_HEADER.pack(SOLVE, height, width) + np.packbits(np.asarray(maze) != 0).tobytes()
+
+
+def decode_maze(height, width, bits):
+    """Decode the packed bits of a solve request into a maze (0 = open cell, 1 = wall)"""
+    cells = np.unpackbits(np.frombuffer(bits, dtype=np.uint8), count=height * width)
+    return cells.reshape(height, width)
+
+
+def shortest_path(maze):
+    """Solve a maze with the shared MDP solvers (the BFS fast path)
+
+    Parameters
+    ----------
+    maze: numpy.ndarray
+        A 2D numpy array where 0 = open cell, 1 = wall
+
+    Returns
+    -------
+    numpy.ndarray
+        The path from the entrance to the goal as flat cell indices (y * width + x)
+    """
+    if not (maze[-1] == 0).any():
+        raise ValueError('The last row of the maze has no open cell (goal)')
+    mdp = maze_mdp(maze)
+    values = solve(mdp)
+    if not np.isfinite(values[0]):
+        raise ValueError('The goal cannot be reached from the entrance')
+
+    # every state-action pair of a maze has exactly one next state
+    next_states = mdp.transitions.indices.reshape(mdp.num_states, mdp.num_actions)
+    actions = greedy_policy(mdp, values)
+    path = [0]
+    while not mdp.terminal[path[-1]]:
+        path.append(next_states[path[-1], actions[path[-1]]])
+
+    cells = np.flatnonzero(maze.ravel() == 0)
+    return cells[path].astype(np.uint32)
+
+
+def _solve_request(height, width, bits):
+    """Worker process entry point: decode, solve, and encode the path"""
+    return shortest_path(decode_maze(height, width, bits)).tobytes()
+
+
+def _warm_up():
+    """Worker process initialization: import everything and run a first solve"""
+    maze = np.ones((3, 3), dtype=np.uint8)
+    maze[:, 1] = 0
+    shortest_path(maze)
+
+
+class MazeService:
+    """The asyncio server behind `rl-maze-service`
+
+    Parameters
+    ----------
+    socket_path: str
+    workers: int, optional
+        The number of worker processes. Default is None (one per CPU).
+    cache_size: int, optional
+        The maximum number of cached solutions
+    latency_window: int, optional
+        The number of most recent requests used for the latency percentiles
+    max_cells: int, optional
+        The largest maze (height * width) accepted in a solve request
+    """
+    def __init__(self, socket_path=DEFAULT_SOCKET, workers=None, cache_size=1024, latency_window=10000,
+                 max_cells=DEFAULT_MAX_CELLS):
+        self.socket_path = socket_path
+        self.workers = workers or os.cpu_count() or 1
+        self.cache_size = cache_size
+        self.max_cells = max_cells
+        self.executor = None
+        self.server = None
+        self._socket_id = None  # the (device, inode) of the socket file this server created
+
+        self.cache = OrderedDict()
+        self.in_flight = {}
+        self.pending_solves = 0  # submitted to the worker pool and not finished yet
+        self.waiting_requests = 0  # waiting for a solve (their own or an identical in-flight one)
+        self.latencies = deque(maxlen=latency_window)
+        self.counters = {'requests': 0, 'solves': 0, 'cache_hits': 0, 'deduplicated': 0, 'errors': 0}
+        self.started = time.time()
+
+    async def start(self):
+        """Start (and warm up) the worker pool, then listen on the socket
+
+        Raises a RuntimeError if another server is already listening on the socket path.
+        """
+        if _socket_in_use(self.socket_path):
+            raise RuntimeError(f'Another service is already listening on {self.socket_path}')
+
+        loop = asyncio.get_running_loop()
+        # every worker process runs the warm-up as it starts, before it accepts any job
+        self.executor = ProcessPoolExecutor(self.workers, initializer=_warm_up)
+        # the processes only start with the first submitted job (all of them with the fork start method,
+        # otherwise one per job), so submit one trivial job per worker and wait for them
+        await asyncio.gather(*[loop.run_in_executor(self.executor, os.getpid) for _ in range(self.workers)])
+
+        # nothing answers on the path, so any file left there is a stale socket of a server which did not shut down
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.server = await asyncio.start_unix_server(self.handle_connection, path=self.socket_path)
+        self._socket_id = _file_id(self.socket_path)
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+        # only remove the socket file if it is still the one this server created
+        if self._socket_id is not None and _file_id(self.socket_path) == self._socket_id:
+            os.unlink(self.socket_path)
+        self._socket_id = None
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.close()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(REQUEST_HEADER.size)
+                except asyncio.IncompleteReadError:
+                    break
+                kind, height, width = REQUEST_HEADER.unpack(header)
+
+                # the rest of the stream cannot be parsed after an unknown or oversized request
+                close = False
+                if kind == STATS:
+                    status, payload = OK, json.dumps(self.stats()).encode()
+                elif kind == SOLVE and height * width > self.max_cells:
+                    self.counters['errors'] += 1
+                    status, payload = ERROR, f'The maze has more than {self.max_cells} cells'.encode()
+                    close = True
+                elif kind == SOLVE:
+                    bits = await reader.readexactly((height * width + 7) // 8)
+                    status, payload = await self.handle_solve(header, height, width, bits)
+                else:
+                    status, payload = ERROR, f'Unknown request kind: {kind!r}'.encode()
+                    close = True
+
+                writer.write(RESPONSE_HEADER.pack(status, len(payload)) + payload)
+                await writer.drain()
+                if close:
+                    break
+        except (ConnectionResetError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle_solve(self, header, height, width, bits):
+        """Answer a solve request from the cache, an identical in-flight solve, or a new solve"""
+        start = time.perf_counter()
+        self.counters['requests'] += 1
+        key = hashlib.blake2b(header + bits, digest_size=16).digest()
+        try:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.counters['cache_hits'] += 1
+                return OK, self.cache[key]
+
+            if key in self.in_flight:
+                self.counters['deduplicated'] += 1
+                self.waiting_requests += 1
+                try:
+                    return OK, await asyncio.shield(self.in_flight[key])
+                finally:
+                    self.waiting_requests -= 1
+
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, _solve_request, height, width, bits)
+            self.pending_solves += 1
+            future.add_done_callback(self._solve_done)
+            self.in_flight[key] = future
+            self.counters['solves'] += 1
+            self.waiting_requests += 1
+            try:
+                path = await asyncio.shield(future)
+            finally:
+                self.waiting_requests -= 1
+                del self.in_flight[key]
+
+            self.cache[key] = path
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+            return OK, path
+        except Exception as e:  # report solver errors (e.g. unsolvable mazes) to the client
+            self.counters['errors'] += 1
+            return ERROR, str(e).encode()
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+
+    def _solve_done(self, future):
+        self.pending_solves -= 1
+
+    def stats(self):
+        """The latency percentiles (in milliseconds), queue depth, and counters of the service
+
+        - pending_solves: the solves submitted to the worker pool which have not finished yet
+        - queue_depth: the pending solves waiting for a free worker
+        - waiting_requests: the requests waiting for a solve, including the ones sharing an identical solve
+        """
+        latencies = np.array(self.latencies) * 1000
+        percentiles = {}
+        if len(latencies) > 0:
+            percentiles = {f'p{p}': float(np.percentile(latencies, p)) for p in (50, 90, 99)}
+            percentiles['max'] = float(latencies.max())
+        return {
+            'uptime': time.time() - self.started,
+            'workers': self.workers,
+            'pending_solves': self.pending_solves,
+            'queue_depth': max(self.pending_solves - self.workers, 0),
+            'waiting_requests': self.waiting_requests,
+            'cache_entries': len(self.cache),
+            'latency_ms': percentiles,
+            **self.counters
+        }
+
+
+def _socket_in_use(socket_path):
+    """Whether a server answers on a Unix socket path"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            return False
+    return True
+
+
+def _file_id(path):
+    """The (device, inode) of a file, or None if it does not exist"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_dev, st.st_ino
+
+
+def _request(socket_path, message):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(message)
+        status, length = RESPONSE_HEADER.unpack(_recv_exactly(sock, RESPONSE_HEADER.size))
+        payload = _recv_exactly(sock, length)
+    if status != OK:
+        raise RuntimeError(payload.decode())
+    return payload
+
+
+def _recv_exactly(sock, size):
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise ConnectionError('The maze service closed the connection')
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def request_solve(maze, socket_path=DEFAULT_SOCKET):
+    """Solve a maze with a running service
+
+    Parameters
+    ----------
+    maze: numpy.ndarray
+        A 2D numpy array where 0 = open cell, 1 = wall
+    socket_path: str, optional
+
+    Returns
+    -------
+    list[tuple]
+        The path as a list of (y, x) cell coordinates
+    """
+    width = maze.shape[1]
+    cells = np.frombuffer(_request(socket_path, encode_maze(maze)), dtype=np.uint32)
+    return [(int(c) // width, int(c) % width) for c in cells]
+
+
+def request_stats(socket_path=DEFAULT_SOCKET):
+    """Fetch the statistics of a running service"""
+    return json.loads(_request(socket_path, REQUEST_HEADER.pack(STATS, 0, 0)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='rl-maze-service', description='Serve maze solves on a Unix socket')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help='The path of the Unix socket')
+    parser.add_argument('--workers', type=int, help='The number of worker processes (default is one per CPU)')
+    parser.add_argument('--cache-size', type=int, default=1024, help='The maximum number of cached solutions')
+    parser.add_argument('--max-cells', type=int, default=DEFAULT_MAX_CELLS,
+                        help='The largest maze (height * width) accepted in a solve request')
+    args = parser.parse_args(argv)
+
+    service = MazeService(args.socket, workers=args.workers, cache_size=args.cache_size, max_cells=args.max_cells)
+    try:
+        asyncio.run(service.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    except RuntimeError as e:
+        print(f'rl-maze-service: {e}', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,280 @@
+"""Vectorized dynamic programming solvers for a TabularMDP"""
+
+import time
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from .telemetry import NULL_TELEMETRY
+
+
+def greedy_policy(mdp, values, gamma=1.0):
+    """Define the greedy policy with respect to a value function
+
+    Ties are broken in favor of the lowest action ID. States without available actions are mapped to action 0.
+
+    Parameters
+    ----------
+    mdp: TabularMDP
+    values: numpy.ndarray
+    gamma: float, optional
+
+    Returns
+    -------
+    numpy.ndarray
+        The action taken in each state
+    """
+    return mdp.action_values(values, gamma).argmax(axis=1)
+
+
+def is_deterministic_unit_cost(mdp, gamma=1.0):
+    """Check whether the optimal values of an MDP are minus the shortest path distances to the terminal states
+
+    This holds for undiscounted MDPs where every available action of a non-terminal state leads to exactly one next
+    state with a reward of -1 (e.g. a maze). States without available actions count as terminal (value of zero).
+
+    Parameters
+    ----------
+    mdp: TabularMDP
+    gamma: float, optional
+
+    Returns
+    -------
+    bool
+    """
+    if gamma != 1:
+        return False
+    absorbing = mdp.terminal | ~mdp.valid_actions.any(axis=1)
+    rows = np.flatnonzero((mdp.valid_actions & ~absorbing[:, np.newaxis]).ravel())
+
+    indptr = mdp.transitions.indptr
+    if np.any(indptr[rows + 1] - indptr[rows] != 1):
+        return False
+    if np.any(mdp.transitions.data[indptr[rows]] != 1):
+        return False
+    return bool(np.all(mdp.expected_rewards[rows] == -1))
+
+
+def _gather_rows(indptr, indices, rows):
+    """Concatenate the column indices of several rows of a CSR matrix (without slicing the matrix)"""
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    total = lengths.sum()
+    if total == 0:
+        return indices[:0]
+    # the position of each gathered entry: its row start plus its offset within the row
+    offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return indices[np.repeat(starts, lengths) + offsets]
+
+
+def bfs_values(mdp, telemetry=None):
+    """Compute the optimal values of a deterministic unit-cost MDP with a reverse breadth-first search
+
+    The search starts from the terminal states and expands one whole distance level at a time with array operations.
+    Only valid when `is_deterministic_unit_cost(mdp)` holds. States which cannot reach a terminal state get -inf.
+
+    Parameters
+    ----------
+    mdp: TabularMDP
+    telemetry: Telemetry, optional
+        Receives a single record for the whole search. Default is None (no telemetry).
+
+    Returns
+    -------
+    numpy.ndarray
+    """
+    telemetry = telemetry or NULL_TELEMETRY
+    start = time.perf_counter()
+
+    # reverse the edges s -> s' of the available actions in the non-terminal states
+    absorbing = mdp.terminal | ~mdp.valid_actions.any(axis=1)
+    rows = np.flatnonzero((mdp.valid_actions & ~absorbing[:, np.newaxis]).ravel())
+    sources = rows // mdp.num_actions
+    targets = mdp.transitions.indices[mdp.transitions.indptr[rows]]
+    reverse = csr_matrix((np.ones(len(rows), dtype=np.int8), (targets, sources)), shape=(mdp.num_states,) * 2)
+
+    distances = np.full(mdp.num_states, -1, dtype=np.int64)
+    frontier = np.flatnonzero(absorbing)
+    distances[frontier] = 0
+    level = 0
+    while len(frontier) > 0:
+        level += 1
+        predecessors = _gather_rows(reverse.indptr, reverse.indices, frontier)
+        frontier = np.unique(predecessors[distances[predecessors] < 0])
+        distances[frontier] = level
+
+    values = np.where(distances >= 0, -distances, -np.inf).astype(np.float64)
+    if telemetry.enabled:
+        telemetry.sweep('bfs', level, 0.0, mdp.num_states, time.perf_counter() - start, values)
+    return values
+
+
+def solve(mdp, gamma=1.0, value_threshold=1e-5, method='auto', telemetry=None):
+    """Compute the optimal value function of an MDP
+
+    Parameters
+    ----------
+    mdp: TabularMDP
+    gamma: float, optional
+    value_threshold: float, optional
+        The convergence threshold of the iterative methods
+    method: str, optional
+        One of 'bfs', 'value_iteration', 'gauss_seidel', 'policy_iteration', or 'auto' (the default), which uses the
+        breadth-first search for deterministic unit-cost MDPs and falls back to value iteration otherwise
+    telemetry: Telemetry, optional
+
+    Returns
+    -------
+    numpy.ndarray
+    """
+    if method == 'auto':
+        method = 'bfs' if is_deterministic_unit_cost(mdp, gamma) else 'value_iteration'
+
+    if method == 'bfs':
+        assert is_deterministic_unit_cost(mdp, gamma), 'The BFS solver needs a deterministic unit-cost MDP!'
+        return bfs_values(mdp, telemetry=telemetry)
+    if method == 'value_iteration':
+        return value_iteration(mdp, gamma, value_threshold, telemetry=telemetry)
+    if method == 'gauss_seidel':
+        return gauss_seidel_value_iteration(mdp, gamma, value_threshold, telemetry=telemetry)
+    if method == 'policy_iteration':
+        return policy_iteration(mdp, gamma, value_threshold, telemetry=telemetry)[1]
+    raise ValueError(f'Unknown solver: {method}')
+
+
+def value_iteration(mdp, gamma=1.0, value_threshold=1e-5, max_sweeps=None, values=None, telemetry=None):
+    """Synchronous value iteration: every sweep backs up all states from the previous value function
+
+    Parameters
+    ----------
+    mdp: TabularMDP
+    gamma: float, optional
+    value_threshold: float, optional
+        Stop once the largest change in value during a sweep falls below this threshold
+    max_sweeps: int, optional
+        The maximum number of sweeps. Default is None (sweep until convergence).
+    values: numpy.ndarray, optional
+        The initial value function. Default is None (all zeros).
+    telemetry: Telemetry, optional
+        Receives a record of every sweep. Default is None (no telemetry).
+
+    Returns
+    -------
+    numpy.ndarray
+    """
+    telemetry = telemetry or NULL_TELEMETRY
+    values = np.zeros(mdp.num_states) if values is None else np.array(values, dtype=np.float64)
+    sweep = 0
+    value_change = np.inf
+    while value_change > value_threshold and (max_sweeps is None or sweep < max_sweeps):
+        start = time.perf_counter()
+        new_values = mdp.backup(values, gamma)
+        value_change = np.abs(new_values - values).max()
+        values = new_values
+        sweep += 1
+        if telemetry.enabled:
+            telemetry.sweep('value_iteration', sweep, value_change, mdp.num_states,
+                            time.perf_counter() - start, values)
+    return values
+
+
+def gauss_seidel_value_iteration(mdp, gamma=1.0, value_threshold=1e-5, max_sweeps=None, values=None,
+                                 block_size=256, telemetry=None):
+    """Gauss-Seidel value iteration: states are backed up in place, one block of states at a time
+
+    Each block sees the values already updated by the blocks before it in the same sweep, which usually needs fewer
+    sweeps than synchronous value iteration. A block size of one gives the classic state-by-state Gauss-Seidel update.
+
+    Parameters
+    ----------
+    mdp: TabularMDP
+    gamma: float, optional
+    value_threshold: float, optional
+        Stop once the largest change in value during a sweep falls below this threshold
+    max_sweeps: int, optional
+        The maximum number of sweeps. Default is None (sweep until convergence).
+    values: numpy.ndarray, optional
+        The initial value function. Default is None (all zeros).
+    block_size: int, optional
+        The number of consecutive states backed up together
+    telemetry: Telemetry, optional
+        Receives a record of every sweep. Default is None (no telemetry).
+
+    Returns
+    -------
+    numpy.ndarray
+    """
+    telemetry = telemetry or NULL_TELEMETRY
+    values = np.zeros(mdp.num_states) if values is None else np.array(values, dtype=np.float64)
+    blocks = [slice(start, min(start + block_size, mdp.num_states)) for start in range(0, mdp.num_states, block_size)]
+
+    sweep = 0
+    value_change = np.inf
+    while value_change > value_threshold and (max_sweeps is None or sweep < max_sweeps):
+        start = time.perf_counter()
+        value_change = 0
+        for block in blocks:
+            new_values = mdp.backup(values, gamma, states=block)
+            value_change = max(value_change, np.abs(new_values - values[block]).max())
+            values[block] = new_values
+        sweep += 1
+        if telemetry.enabled:
+            telemetry.sweep('gauss_seidel', sweep, value_change, mdp.num_states,
+                            time.perf_counter() - start, values)
+    return values
+
+
+def policy_iteration(mdp, gamma=1.0, value_threshold=1e-5, evaluation_sweeps=100, max_iterations=None,
+                     telemetry=None):
+    """(Modified) policy iteration: alternate between evaluating the greedy policy and improving it
+
+    The policy is evaluated with at most `evaluation_sweeps` iterative backups, so improper policies in undiscounted
+    problems (e.g. running into a wall forever) do not need to be evaluated exactly.
+
+    Parameters
+    ----------
+    mdp: TabularMDP
+    gamma: float, optional
+    value_threshold: float, optional
+        The convergence threshold for both the policy evaluation and the final Bellman residual
+    evaluation_sweeps: int, optional
+        The maximum number of backups per policy evaluation
+    max_iterations: int, optional
+        The maximum number of policy improvement steps. Default is None (iterate until convergence).
+    telemetry: Telemetry, optional
+        Receives a record of every policy evaluation sweep. Default is None (no telemetry).
+
+    Returns
+    -------
+    numpy.ndarray, numpy.ndarray
+        The policy (action per state) and its value function
+    """
+    telemetry = telemetry or NULL_TELEMETRY
+    values = np.zeros(mdp.num_states)
+    policy = greedy_policy(mdp, values, gamma)
+
+    sweep = 0
+    iteration = 0
+    while max_iterations is None or iteration < max_iterations:
+        # policy evaluation
+        policy_transitions, policy_rewards = mdp.policy_model(policy)
+        for _ in range(evaluation_sweeps):
+            start = time.perf_counter()
+            new_values = policy_rewards + gamma * (policy_transitions @ values)
+            value_change = np.abs(new_values - values).max()
+            values = new_values
+            sweep += 1
+            if telemetry.enabled:
+                telemetry.sweep('policy_iteration', sweep, value_change, mdp.num_states,
+                                time.perf_counter() - start, values)
+            if value_change <= value_threshold:
+                break
+
+        # policy improvement
+        new_policy = greedy_policy(mdp, values, gamma)
+        residual = np.abs(mdp.backup(values, gamma) - values).max()
+        iteration += 1
+        if np.array_equal(new_policy, policy) and residual <= value_threshold:
+            break
+        policy = new_policy
+    return policy, values
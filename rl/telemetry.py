@@ -0,0 +1,171 @@
+"""Lightweight instrumentation for the solvers and simulations
+
+A `Telemetry` object collects flat records (dictionaries) of three kinds:
+
+- phase: wall time and peak traced memory of a named phase (e.g. build, solve, policy, rollout)
+- sweep: the Bellman residual and backup throughput of one solver sweep
+- chunk: the size and wall time of one chunk of a batched simulation
+
+Functions that accept a `telemetry` argument default to `NULL_TELEMETRY`, whose methods do nothing,
+so the instrumentation costs next to nothing when it is disabled.
+"""
+
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+
+class Telemetry:
+    """Collect solver and simulation telemetry records
+
+    Parameters
+    ----------
+    trace_memory: bool, optional
+        Track the peak memory of each phase with tracemalloc (this slows down allocation-heavy code)
+    sweep_callbacks: list[callable], optional
+        Functions called as `callback(record, values)` after every solver sweep
+    chunk_callbacks: list[callable], optional
+        Functions called as `callback(record)` after every simulated chunk
+    """
+    enabled = True
+
+    def __init__(self, trace_memory=True, sweep_callbacks=None, chunk_callbacks=None):
+        self.trace_memory = trace_memory
+        self.sweep_callbacks = list(sweep_callbacks or [])
+        self.chunk_callbacks = list(chunk_callbacks or [])
+        self.records = []
+        self._peaks = []
+        self._started_tracing = False
+
+    @contextmanager
+    def phase(self, name, **fields):
+        """Time a named phase and record its peak traced memory
+
+        Parameters
+        ----------
+        name: str
+        fields:
+            Extra fields stored in the record
+        """
+        if self.trace_memory:
+            self._enter_memory_phase()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = {'event': 'phase', 'phase': name, 'wall_time': time.perf_counter() - start, **fields}
+            if self.trace_memory:
+                record['peak_memory'] = self._exit_memory_phase()
+            self.records.append(record)
+
+    def sweep(self, solver, sweep, residual, backups, wall_time, values=None):
+        """Record one solver sweep
+
+        Parameters
+        ----------
+        solver: str
+            The name of the solver
+        sweep: int
+            The sweep number (starting at 1)
+        residual: float
+            The largest change in value during the sweep
+        backups: int
+            The number of state backups performed in the sweep
+        wall_time: float
+            The duration of the sweep in seconds
+        values: numpy.ndarray, optional
+            The value function after the sweep (only passed on to the callbacks)
+        """
+        record = {
+            'event': 'sweep',
+            'solver': solver,
+            'sweep': sweep,
+            'residual': float(residual),
+            'backups': backups,
+            'wall_time': wall_time,
+            'backups_per_second': backups / wall_time if wall_time > 0 else float('inf')
+        }
+        self.records.append(record)
+        for callback in self.sweep_callbacks:
+            callback(record, values)
+
+    def chunk(self, name, index, size, wall_time, **fields):
+        """Record one chunk of a batched simulation
+
+        Parameters
+        ----------
+        name: str
+            The name of the simulation
+        index: int
+            The chunk number (starting at 0)
+        size: int
+            The number of items (e.g. episodes or runs) simulated in the chunk
+        wall_time: float
+            The duration of the chunk in seconds
+        fields:
+            Extra fields stored in the record
+        """
+        record = {
+            'event': 'chunk',
+            'name': name,
+            'index': index,
+            'size': size,
+            'wall_time': wall_time,
+            'items_per_second': size / wall_time if wall_time > 0 else float('inf'),
+            **fields
+        }
+        self.records.append(record)
+        for callback in self.chunk_callbacks:
+            callback(record)
+
+    def filter(self, event):
+        """Select the records of one kind ('phase', 'sweep' or 'chunk')"""
+        return [record for record in self.records if record['event'] == event]
+
+    def to_jsonl(self, path):
+        """Write the records as JSON lines (one record per line)
+
+        Parameters
+        ----------
+        path: str or pathlib.Path
+        """
+        with open(path, 'w') as file:
+            for record in self.records:
+                file.write(json.dumps(record) + '\n')
+
+    def _enter_memory_phase(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        # carry the peak of the enclosing phase before resetting it for this phase
+        if self._peaks:
+            self._peaks[-1] = max(self._peaks[-1], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        self._peaks.append(0)
+
+    def _exit_memory_phase(self):
+        peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+        if self._peaks:
+            self._peaks[-1] = max(self._peaks[-1], peak)
+        elif self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        return peak
+
+
+class NullTelemetry:
+    """A disabled telemetry object: every method is a no-op"""
+    enabled = False
+
+    def phase(self, name, **fields):
+        return nullcontext()
+
+    def sweep(self, solver, sweep, residual, backups, wall_time, values=None):
+        pass
+
+    def chunk(self, name, index, size, wall_time, **fields):
+        pass
+
+
+NULL_TELEMETRY = NullTelemetry()
@@ -1,6 +1,5 @@
 """A Dijkstra shortest path solution to a maze"""
 
-import matplotlib.pyplot as plt
 from scipy.sparse import csr_matrix
 from scipy.sparse.csgraph import dijkstra
 
@@ -41,6 +40,8 @@ def dijkstra_solution(maze):
 
 
 if __name__ == '__main__':
+    import matplotlib.pyplot as plt
+
     GRID_HEIGHT = 20
     GRID_WIDTH = 40
     create_maze = MazeGenerator()
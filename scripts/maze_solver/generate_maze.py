@@ -2,7 +2,6 @@
 
 import random
 
-import matplotlib.pyplot as plt
 import numpy as np
 
 WALL = 1
@@ -153,6 +152,8 @@ class MazeGenerator:
 
 
 if __name__ == '__main__':
+    import matplotlib.pyplot as plt
+
     create_maze = MazeGenerator()
     m = create_maze(50, 100)
     m = np.where(m == 0, 1, 0)
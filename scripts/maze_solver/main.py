@@ -1,13 +1,13 @@
 """A demo example for both the Dijkstra and Value Iteration solutions to a random maze"""
 
-import matplotlib.pyplot as plt
-
 from dijkstra import dijkstra_solution
 from generate_maze import MazeGenerator
 from maze_utils import plot_maze
 from value_iter import MazeEnvironment, value_iteration_solution
 
 if __name__ == '__main__':
+    import matplotlib.pyplot as plt
+
     # create the maze
     GRID_HEIGHT = 40
     GRID_WIDTH = 40
@@ -16,7 +16,7 @@ if __name__ == '__main__':
 
     # gather both solutions
     d_solution = dijkstra_solution(maze)
-    v_solution, *_ = value_iteration_solution(MazeEnvironment(maze))
+    v_solution, *_ = value_iteration_solution(MazeEnvironment(maze), method='value_iteration')
 
     # plot the solutions
     fig, (ax1, ax2) = plt.subplots(1, 2)
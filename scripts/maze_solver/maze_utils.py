@@ -1,7 +1,15 @@
 """Utilities for solving a maze"""
 
+import struct
+import zlib
+from pathlib import Path
+
 import numpy as np
 
+# RGB colors of the rendered maze cells
+WALL_COLOR = (0, 0, 0)
+OPEN_COLOR = (255, 255, 255)
+
 
 def index_maze_cells(maze):
     """Index the open cells in the maze
@@ -48,6 +56,170 @@ def get_maze_adjacency(maze):
     return nodes, adjacency
 
 
+def render_maze(maze, path=None, color=(255, 0, 0), out=None):
+    """Render the maze with an optional solution as an RGB image
+
+    Parameters
+    ----------
+    maze: numpy.ndarray
+        A 2D numpy array where 0 = open cell, 1 = wall
+    path: list[tuple] or numpy.ndarray, optional
+        The solution as a list of open cell coordinates (or a (length, 2) array). Default is None (no solution).
+    color: tuple, optional
+        The RGB color for the path (default is red)
+    out: numpy.ndarray, optional
+        A preallocated (height, width, 3) uint8 buffer to render into (e.g. a tile of a sprite sheet)
+
+    Returns
+    -------
+    numpy.ndarray
+        The (height, width, 3) uint8 image
+    """
+    if out is None:
+        out = np.empty((*maze.shape, 3), dtype=np.uint8)
+
+    # walls are black and open cells are white
+    out[...] = WALL_COLOR
+    out[maze == 0] = OPEN_COLOR
+
+    if path is not None and len(path) > 0:
+        # draw the whole path on the maze at once
+        cells = np.asarray(path)
+        out[cells[:, 0], cells[:, 1]] = color
+    return out
+
+
+def render_sprite_sheet(mazes, paths=None, n_cols=None, padding=1, color=(255, 0, 0), background=(128, 128, 128)):
+    """Render many mazes (with optional solutions) into one tiled RGB image
+
+    Every maze is rendered straight into its tile of a single preallocated buffer.
+
+    Parameters
+    ----------
+    mazes: list[numpy.ndarray]
+        The mazes (they may have different shapes, each tile is as large as the largest maze)
+    paths: list, optional
+        One solution (or None) per maze. Default is None (no solutions).
+    n_cols: int, optional
+        The number of tiles per row. Default is None (as close to a square sheet as possible).
+    padding: int, optional
+        The number of background pixels between the tiles
+    color: tuple, optional
+        The RGB color for the paths (default is red)
+    background: tuple, optional
+        The RGB color between (and around smaller) tiles
+
+    Returns
+    -------
+    numpy.ndarray
+        The (rows * tile_height, cols * tile_width, 3) uint8 sprite sheet (including the padding)
+    """
+    n_mazes = len(mazes)
+    if n_mazes == 0:
+        raise ValueError('A sprite sheet needs at least one maze')
+    if paths is None:
+        paths = [None] * n_mazes
+    if n_cols is None:
+        n_cols = int(np.ceil(np.sqrt(n_mazes)))
+    n_rows = int(np.ceil(n_mazes / n_cols))
+
+    tile_height = max(m.shape[0] for m in mazes) + padding
+    tile_width = max(m.shape[1] for m in mazes) + padding
+    sheet = np.empty((n_rows * tile_height + padding, n_cols * tile_width + padding, 3), dtype=np.uint8)
+    sheet[...] = background
+
+    for i, (maze, path) in enumerate(zip(mazes, paths)):
+        y = (i // n_cols) * tile_height + padding
+        x = (i % n_cols) * tile_width + padding
+        render_maze(maze, path, color, out=sheet[y:y + maze.shape[0], x:x + maze.shape[1]])
+    return sheet
+
+
+def upscale(image, scale):
+    """Enlarge an image by an integer factor (each pixel becomes a scale x scale block)"""
+    if scale == 1:
+        return image
+    return image.repeat(scale, axis=0).repeat(scale, axis=1)
+
+
+def write_png(path, image):
+    """Write an RGB uint8 image as a PNG file (without matplotlib or PIL)
+
+    Parameters
+    ----------
+    path: str or pathlib.Path
+    image: numpy.ndarray
+        A (height, width, 3) uint8 array
+    """
+    height, width, _ = image.shape
+
+    # every row of pixels is prefixed with the filter type (0 = no filter)
+    raw = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    raw[:, 1:] = image.reshape(height, width * 3)
+
+    def chunk(chunk_type, data):
+        body = chunk_type + data
+        return struct.pack('>I', len(data)) + body + struct.pack('>I', zlib.crc32(body) & 0xffffffff)
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)  # 8-bit depth, truecolor RGB
+    with open(path, 'wb') as file:
+        file.write(b'\x89PNG\r\n\x1a\n')
+        file.write(chunk(b'IHDR', header))
+        file.write(chunk(b'IDAT', zlib.compress(raw.tobytes(), 6)))
+        file.write(chunk(b'IEND', b''))
+
+
+class ValueFrameWriter:
+    """Stream the value function of a maze to a numbered PNG image sequence while value iteration runs
+
+    Use it as a sweep callback of `rl.Telemetry`, e.g. `Telemetry(sweep_callbacks=[ValueFrameWriter(maze, 'frames')])`.
+    Open cells are shaded from `far_color` (the lowest value) to `near_color` (a value of zero, i.e. the goal).
+
+    Parameters
+    ----------
+    maze: numpy.ndarray
+        A 2D numpy array where 0 = open cell, 1 = wall
+    directory: str or pathlib.Path
+        Where to write the frames (created if needed)
+    every: int, optional
+        Only write every n-th sweep
+    scale: int, optional
+        Enlarge each cell to a scale x scale block of pixels
+    far_color: tuple, optional
+    near_color: tuple, optional
+    """
+    def __init__(self, maze, directory, every=1, scale=1, far_color=(0, 0, 255), near_color=(255, 255, 0)):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.every = every
+        self.scale = scale
+        self.far_color = np.array(far_color, dtype=np.float64)
+        self.near_color = np.array(near_color, dtype=np.float64)
+        self.frames_written = 0
+
+        # the states of the maze MDP are the open cells in row-major order
+        self._ys, self._xs = np.nonzero(maze == 0)
+        self._frame = np.empty((*maze.shape, 3), dtype=np.uint8)
+        self._frame[...] = WALL_COLOR
+
+    def render(self, values):
+        """Render the value function into the (reused) frame buffer"""
+        values = np.asarray(values, dtype=np.float64)
+        finite = np.isfinite(values)
+        lowest = values[finite].min() if finite.any() else 0
+        weights = np.zeros(len(values)) if lowest == 0 else np.where(finite, 1 - values / lowest, 0)
+        colors = self.far_color + weights[:, np.newaxis] * (self.near_color - self.far_color)
+        self._frame[self._ys, self._xs] = colors.astype(np.uint8)
+        return self._frame
+
+    def __call__(self, record, values):
+        if values is None or record['sweep'] % self.every != 0:
+            return
+        frame = upscale(self.render(values), self.scale)
+        write_png(self.directory / f'frame_{record["sweep"]:06d}.png', frame)
+        self.frames_written += 1
+
+
 def plot_maze(ax, maze, path=None, color=(255, 0, 0)):
     """Plot the maze with an optional solution
 
@@ -66,16 +238,6 @@ def plot_maze(ax, maze, path=None, color=(255, 0, 0)):
     -------
     matplotlib.pyplot.Axes
     """
-    # change the pixel values to create an image
-    maze = np.where(maze == 0, 255, 0)
-    maze = np.tile(maze.reshape((1, *maze.shape)), [3, 1, 1])
-
-    if path is not None:
-        # draw the path on the maze
-        for y, x in path:
-            maze[:, y, x] = color
-
-    maze = maze.transpose((1, 2, 0))
-    ax.imshow(maze)
+    ax.imshow(render_maze(maze, path, color))
     ax.axis('off')
     return ax
@@ -0,0 +1,319 @@
+"""Cross-check the Dijkstra and Value Iteration solutions on many random mazes
+
+The mazes flow through three stages of worker processes, joined by bounded queues:
+
+generate (MazeGenerator) -> dijkstra (dijkstra_solution) -> value iteration (value_iteration_solution) -> verify
+
+- The stages overlap: every stage starts working as soon as the first maze reaches it
+- A full queue blocks the stage feeding it (backpressure), so a slow stage never builds up an unbounded backlog
+- Once every worker of a stage has exited (flushing its queued mazes),
+  one stop signal is sent per worker of the next stage
+- A worker that fails keeps draining its input queue so that the pipeline still shuts down, and the run then raises
+- The main process verifies that both solutions have the same length and writes out every maze where they disagree
+- Every stage reports its throughput along with the time its workers spent blocked on the queues
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import queue
+import random
+import threading
+import time
+import traceback
+from pathlib import Path
+
+import numpy as np
+
+from dijkstra import dijkstra_solution
+from generate_maze import MazeGenerator
+from maze_utils import render_sprite_sheet, write_png
+from value_iter import MazeEnvironment, value_iteration_solution
+
+STOP = None
+
+
+def generate_stage(worker_id, num_workers, count, height, width, base_seed):
+    """Generate every `num_workers`-th maze starting at `worker_id` (each maze is seeded by its index)"""
+    create_maze = MazeGenerator()
+    for idx in range(worker_id, count, num_workers):
+        seed = base_seed + idx
+        np.random.seed(seed)
+        random.seed(seed)
+        yield {'idx': idx, 'seed': seed, 'maze': create_maze(height, width).astype(np.int8)}
+
+
+def dijkstra_stage(item):
+    item['dijkstra_path'] = dijkstra_solution(item['maze'])
+    return item
+
+
+def value_iteration_stage(item):
+    # force value iteration (not the BFS fast path) so that the cross-check exercises it
+    item['value_iteration_path'], *_ = value_iteration_solution(MazeEnvironment(item['maze']),
+                                                                method='value_iteration')
+    return item
+
+
+def run_worker(stage, in_queue, out_queue, stats_queue, generate_args=None):
+    """Run one worker process of a stage
+
+    Parameters
+    ----------
+    stage: str
+        The name of the stage ('generate', 'dijkstra' or 'value_iteration')
+    in_queue: multiprocessing.Queue
+        The queue to read mazes from (None for the generate stage)
+    out_queue: multiprocessing.Queue
+        The queue to write the processed mazes to
+    stats_queue: multiprocessing.Queue
+        Receives the throughput statistics of the worker when it finishes (along with the traceback if it failed)
+    generate_args: tuple, optional
+        The arguments of `generate_stage` after the worker ID (only for the generate stage)
+    """
+    process = {'dijkstra': dijkstra_stage, 'value_iteration': value_iteration_stage}.get(stage)
+    items = 0
+    busy_time = 0
+    get_wait = 0
+    put_wait = 0
+    error = None
+    start = time.perf_counter()
+
+    try:
+        if stage == 'generate':
+            source = generate_stage(*generate_args)
+        else:
+            source = None
+
+        while True:
+            t0 = time.perf_counter()
+            if source is not None:
+                item = next(source, STOP)
+                t1 = time.perf_counter()
+                busy_time += t1 - t0
+            else:
+                item = in_queue.get()
+                t1 = time.perf_counter()
+                get_wait += t1 - t0
+            if item is STOP:
+                break
+
+            if process is not None:
+                item = process(item)
+            t2 = time.perf_counter()
+            busy_time += t2 - t1
+
+            out_queue.put(item)
+            put_wait += time.perf_counter() - t2
+            items += 1
+    except Exception:
+        error = traceback.format_exc()
+        # keep consuming until the stop signal so that the previous stage never blocks on a full queue
+        if in_queue is not None:
+            while in_queue.get() is not STOP:
+                pass
+        raise
+    finally:
+        stats_queue.put({
+            'stage': stage,
+            'items': items,
+            'wall_time': time.perf_counter() - start,
+            'busy_time': busy_time,
+            'get_wait': get_wait,
+            'put_wait': put_wait,
+            'error': error
+        })
+
+
+def forward_stop(workers, out_queue, num_next_workers):
+    """Wait for every worker of a stage to exit, then tell every worker of the next stage to stop
+
+    A worker process only exits once all of its mazes are flushed into its output queue,
+    so the stop signals always arrive behind the last maze of the stage.
+    """
+    for p in workers:
+        p.join()
+    for _ in range(num_next_workers):
+        out_queue.put(STOP)
+
+
+def queue_depths(queues):
+    """The number of mazes waiting in each queue (not available on every platform, e.g. macOS)"""
+    try:
+        return [q.qsize() for q in queues]
+    except NotImplementedError:
+        return None
+
+
+def summarize_stats(worker_stats, stage_names):
+    """Combine the per-worker statistics into per-stage throughput"""
+    summary = {}
+    for stage in stage_names:
+        stats = [s for s in worker_stats if s['stage'] == stage]
+        wall_time = max(s['wall_time'] for s in stats)
+        items = sum(s['items'] for s in stats)
+        summary[stage] = {
+            'workers': len(stats),
+            'items': items,
+            'wall_time': wall_time,
+            'throughput': items / wall_time if wall_time > 0 else float('inf'),
+            'busy_fraction': sum(s['busy_time'] for s in stats) / sum(s['wall_time'] for s in stats),
+            'get_wait': sum(s['get_wait'] for s in stats),
+            'put_wait': sum(s['put_wait'] for s in stats)
+        }
+    return summary
+
+
+def run_pipeline(count, height, width, workers=(1, 1, 1), queue_size=64, seed=0, output_dir=None,
+                 report_every=1000):
+    """Generate and solve `count` mazes with both solvers and verify that the solution lengths agree
+
+    Parameters
+    ----------
+    count: int
+        The number of mazes
+    height: int
+    width: int
+    workers: tuple[int], optional
+        The number of worker processes of the generate, dijkstra, and value iteration stages
+    queue_size: int, optional
+        The capacity of each queue between the stages
+    seed: int, optional
+        Maze i is generated with the seed `seed + i`
+    output_dir: str or pathlib.Path, optional
+        Where to write the mazes with disagreeing solutions. Default is None (don't write them).
+    report_every: int, optional
+        Print the progress every this many verified mazes (0 to disable)
+
+    Returns
+    -------
+    list[dict], dict
+        The mazes with disagreeing solutions and the throughput statistics per stage
+
+    Raises
+    ------
+    RuntimeError
+        If a worker failed, i.e. not every maze was verified
+    """
+    stage_names = ['generate', 'dijkstra', 'value_iteration']
+    _, num_dijkstra, num_value_iteration = workers
+    queues = [mp.Queue(maxsize=queue_size) for _ in stage_names]
+    stats_queue = mp.Queue()
+
+    processes = []
+    forwarders = []
+    stage_inputs = [None, queues[0], queues[1]]
+    next_workers = [num_dijkstra, num_value_iteration, 1]  # the main process is the only verify worker
+    for stage, in_queue, out_queue, num_workers, num_next in zip(stage_names, stage_inputs, queues, workers,
+                                                                 next_workers):
+        stage_processes = []
+        for worker_id in range(num_workers):
+            generate_args = (worker_id, num_workers, count, height, width, seed) if stage == 'generate' else None
+            args = (stage, in_queue, out_queue, stats_queue, generate_args)
+            stage_processes.append(mp.Process(target=run_worker, args=args, daemon=True))
+        processes += stage_processes
+        forwarders.append(threading.Thread(target=forward_stop, args=(stage_processes, out_queue, num_next),
+                                           daemon=True))
+
+    start = time.perf_counter()
+    for p in processes:
+        p.start()
+    for t in forwarders:
+        t.start()
+
+    # verify stage: compare the solution lengths
+    disagreements = []
+    verified = 0
+    while True:
+        item = queues[-1].get()
+        if item is STOP:
+            break
+        verified += 1
+        d_length = len(item['dijkstra_path'])
+        v_length = len(item['value_iteration_path'])
+        if d_length != v_length:
+            disagreements.append(item)
+            if output_dir is not None:
+                save_disagreement(output_dir, item)
+        if report_every and verified % report_every == 0:
+            elapsed = time.perf_counter() - start
+            print(f'verified {verified}/{count} mazes ({verified / elapsed:.1f} mazes/s), '
+                  f'{len(disagreements)} disagreements, queue depths {queue_depths(queues)}')
+    verify_time = time.perf_counter() - start
+
+    for t in forwarders:
+        t.join()
+    # every worker has exited, so its statistics are already in the queue (unless it was killed)
+    worker_stats = []
+    for _ in processes:
+        try:
+            worker_stats.append(stats_queue.get(timeout=1))
+        except queue.Empty:
+            break
+
+    errors = [f'{s["stage"]} worker failed:\n{s["error"]}' for s in worker_stats if s['error'] is not None]
+    failed = [p for p in processes if p.exitcode != 0]
+    if failed and not errors:
+        errors = [f'{len(failed)} worker processes exited with codes {[p.exitcode for p in failed]}']
+    if verified != count:
+        errors.append(f'Only {verified} of {count} mazes were verified')
+    if errors:
+        raise RuntimeError('\n'.join(errors))
+
+    stats = summarize_stats(worker_stats, stage_names)
+    stats['verify'] = {
+        'workers': 1,
+        'items': verified,
+        'wall_time': verify_time,
+        'throughput': verified / verify_time if verify_time > 0 else float('inf'),
+        'disagreements': len(disagreements)
+    }
+    return disagreements, stats
+
+
+def save_disagreement(output_dir, item):
+    """Write a maze (and both of its solutions) whose solution lengths disagree"""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(
+        output_dir / f'maze_{item["idx"]:06d}.npz',
+        maze=item['maze'],
+        seed=item['seed'],
+        dijkstra_path=np.array(item['dijkstra_path']),
+        value_iteration_path=np.array(item['value_iteration_path'])
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cross-check the Dijkstra and Value Iteration maze solutions')
+    parser.add_argument('--count', type=int, default=10000, help='The number of mazes')
+    parser.add_argument('--height', type=int, default=20)
+    parser.add_argument('--width', type=int, default=40)
+    parser.add_argument('--workers', type=int, nargs=3, metavar=('GENERATE', 'DIJKSTRA', 'VALUE_ITER'),
+                        help='The number of worker processes per stage (default splits the CPUs evenly)')
+    parser.add_argument('--queue-size', type=int, default=64, help='The capacity of the queues between the stages')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output-dir', type=Path, default=Path('disagreements'),
+                        help='Where to write the mazes whose solutions disagree')
+    args = parser.parse_args()
+
+    workers = args.workers or [max(1, (os.cpu_count() or 3) // 3)] * 3
+    disagreements, stats = run_pipeline(args.count, args.height, args.width, workers=workers,
+                                        queue_size=args.queue_size, seed=args.seed, output_dir=args.output_dir)
+
+    for stage, s in stats.items():
+        print(f'{stage:<16} {s["workers"]:>3} workers {s["items"]:>8} mazes {s["throughput"]:>10.1f} mazes/s')
+    print(json.dumps(stats, indent=2))
+
+    if disagreements:
+        mazes = [item['maze'] for item in disagreements[:64]]
+        paths = [item['value_iteration_path'] for item in disagreements[:64]]
+        write_png(args.output_dir / 'disagreements.png', render_sprite_sheet(mazes, paths))
+        print(f'{len(disagreements)} mazes have disagreeing solutions (written to {args.output_dir})')
+    else:
+        print(f'All {stats["verify"]["items"]} mazes have solutions of the same length')
+
+
+if __name__ == '__main__':
+    main()
@@ -18,11 +18,14 @@ Notes
 * Episodic -> no discount, penalize the length of the solution
 * Value Iteration update: V(s) <- max(reward + V(s'))
 * Optimal Policy update: pi(s) = argmax over actions (reward + V(s'))
+* Since every move costs -1, the optimal values are minus the BFS distance to the goal, so by default
+  the values come from a single reverse breadth-first search instead of value iteration sweeps
 """
 
-import matplotlib.pyplot as plt
 import numpy as np
 
+from rl import NULL_TELEMETRY, from_maze_environment, greedy_policy, solve
+
 from generate_maze import MazeGenerator
 from maze_utils import index_maze_cells, plot_maze
 
@@ -94,68 +97,50 @@ class MazeEnvironment:
         return cell, -1
 
 
-def calculate_action_values(maze_env, cell, values):
-    """Calculate the action-values given the maze environment, current cell, and current value function
-
-    Parameters
-    ----------
-    maze_env: MazeEnvironment
-    cell: tuple
-    values: numpy.ndarray
-
-    Returns
-    -------
-    list[float]
-    """
-    action_values = []
-    for action in ACTIONS:
-        new_cell, reward = maze_env.transition(cell, action)
-        v = values[maze_env.cell_to_index[new_cell]]  # value of next state
-        action_values.append(reward + v)
-    return action_values
-
-
-def value_iteration_solution(maze_env, value_threshold=1e-5):
+def value_iteration_solution(maze_env, value_threshold=1e-5, method='auto', telemetry=None):
     """Value Iteration approach to solving a maze
 
     Parameters
     ----------
     maze_env: MazeEnvironment
     value_threshold: float, optional
+    method: str, optional
+        The solver used by `rl.solve` (by default the BFS fast path for deterministic unit-cost MDPs, otherwise
+        value iteration)
+    telemetry: rl.Telemetry, optional
+        Records the build, solve, policy extraction, and rollout phases along with every sweep
 
     Returns
     -------
-    dict[tuple, int], list[tuple]
+    list[tuple], dict[tuple, int], numpy.ndarray
     """
-    num_states = len(maze_env.open_cells)
-    values = np.zeros(num_states)
+    telemetry = telemetry or NULL_TELEMETRY
+
+    with telemetry.phase('build'):
+        mdp = from_maze_environment(maze_env)
 
     # value iteration: approximate the value function
-    value_change = 1
-    while value_change > value_threshold:
-        value_change = 0
-        old_values = values.copy()
-        for i, cell in enumerate(maze_env.open_cells):
-            action_values = calculate_action_values(maze_env, cell, values)
-            values[i] = max(action_values)
-        value_change = max(value_change, np.abs(values - old_values).max())
+    with telemetry.phase('solve'):
+        values = solve(mdp, value_threshold=value_threshold, method=method, telemetry=telemetry)
 
     # defining the policy: map a cell to one of four actions
-    policy = dict()
-    for cell in maze_env.open_cells:
-        action_values = np.array(calculate_action_values(maze_env, cell, values))
-        policy[cell] = ACTIONS[action_values.argmax()]
+    with telemetry.phase('policy'):
+        actions = greedy_policy(mdp, values)
+        policy = {cell: ACTIONS[a] for cell, a in zip(maze_env.open_cells, actions)}
 
     # apply the policy
-    current_cell = maze_env.open_cells[0]
-    maze_solution = [current_cell]
-    while current_cell != maze_env.goal:
-        current_cell, _ = maze_env.transition(current_cell, policy[current_cell])
-        maze_solution.append(current_cell)
+    with telemetry.phase('rollout'):
+        current_cell = maze_env.open_cells[0]
+        maze_solution = [current_cell]
+        while current_cell != maze_env.goal:
+            current_cell, _ = maze_env.transition(current_cell, policy[current_cell])
+            maze_solution.append(current_cell)
     return maze_solution, policy, values
 
 
 if __name__ == '__main__':
+    import matplotlib.pyplot as plt
+
     GRID_HEIGHT = 40
     GRID_WIDTH = 80
 
@@ -9,9 +9,10 @@
 - Undiscounted, episodic, finite MDP
 """
 
-import matplotlib.pyplot as plt
 import numpy as np
 
+from rl import NULL_TELEMETRY, from_coin_flip_environment, greedy_policy, solve
+
 
 def get_max_stake(capital, goal):
     """Define the maximum stake (action) which can be made given the current capital (state)
@@ -28,41 +29,6 @@ def get_max_stake(capital, goal):
     return min(capital, goal - capital)
 
 
-def calculate_action_values(coin_env, values, state):
-    """Calculate the action-values
-
-    Parameters
-    ----------
-    coin_env: CoinFlipEnvironment
-    values: numpy.ndarray
-    state: int
-
-    Returns
-    -------
-    list[int]
-    """
-    action_values = []
-    for action in range(1, get_max_stake(state, coin_env.goal) + 1):
-        action_val = 0
-
-        # option 1: heads -> win
-        p = coin_env.p_head
-        new_state = state + action
-        v = values[new_state]
-        reward = coin_env.get_reward(new_state)
-        action_val += p * (reward + v)
-
-        # option 2: tails -> lose
-        p = 1 - coin_env.p_head
-        new_state = state - action
-        v = values[new_state]
-        reward = coin_env.get_reward(new_state)
-        action_val += p * (reward + v)
-
-        action_values.append(action_val)
-    return action_values
-
-
 class CoinFlipEnvironment:
     def __init__(self, p_head, goal=100):
         """Initialization
@@ -108,76 +74,85 @@ class CoinFlipEnvironment:
         return capital, reward
 
 
-def value_iteration_solution(coin_env, value_threshold=1e-7):
+def value_iteration_solution(coin_env, value_threshold=1e-7, method='auto', telemetry=None):
     """Value Iteration solution to Gambler's Problem
 
     Parameters
     ----------
     coin_env: CoinFlipEnvironment
     value_threshold: float, optional
+    method: str, optional
+        The solver passed to `rl.solve`. The coin flips make the MDP stochastic, so the default ('auto') runs value
+        iteration.
+    telemetry: rl.Telemetry, optional
+        Records the build, solve, and policy extraction phases along with every sweep
 
     Returns
     -------
     dict[int, int], numpy.ndarray
     """
-    num_states = coin_env.goal + 1
-    values = np.zeros(num_states)
+    telemetry = telemetry or NULL_TELEMETRY
+
+    with telemetry.phase('build'):
+        mdp = from_coin_flip_environment(coin_env)
 
     # value iteration: approximate the value function
-    value_change = 1
-    while value_change > value_threshold:
-        value_change = 0
-        old_values = values.copy()
-        for state in range(1, num_states-1):
-            values[state] = max(calculate_action_values(coin_env, values, state))
-        value_change = max(value_change, np.abs(values - old_values).max())
-
-    # defining the policy: map each state to an action
-    policy = dict()
-    for state in range(1, coin_env.goal):
-        action_values = np.array(calculate_action_values(coin_env, values, state))
-        policy[state] = action_values.argmax() + 1
+    with telemetry.phase('solve'):
+        values = solve(mdp, value_threshold=value_threshold, method=method, telemetry=telemetry)
+
+    # defining the policy: map each state to an action (the action IDs are the stakes themselves)
+    with telemetry.phase('policy'):
+        stakes = greedy_policy(mdp, values)
+        policy = {state: stakes[state] for state in range(1, coin_env.goal)}
 
     return policy, values
 
 
-if __name__ == '__main__':
-    states = range(1, 100)
-    policy_fn, value_fn = value_iteration_solution(CoinFlipEnvironment(0.25))
-    stakes_25 = [policy_fn[s] for s in states]
-    values_25 = [value_fn[s] for s in states]
-
-    policy_fn, value_fn = value_iteration_solution(CoinFlipEnvironment(0.4))
-    stakes_40 = [policy_fn[s] for s in states]
-    values_40 = [value_fn[s] for s in states]
-
-    policy_fn, value_fn = value_iteration_solution(CoinFlipEnvironment(0.55))
-    stakes_55 = [policy_fn[s] for s in states]
-    values_55 = [value_fn[s] for s in states]
-
-    fig, ((ax_p25, ax_p40), (ax_p55, ax_v)) = plt.subplots(2, 2)
-    ax_p25.bar(states, stakes_25)
-    ax_p25.set_title('Policy: P_head = 0.25')
-    ax_p25.set_xlabel('Capital')
-    ax_p25.set_ylabel('Stake')
-
-    ax_p40.bar(states, stakes_40)
-    ax_p40.set_title('Policy: P_head = 0.40')
-    ax_p40.set_xlabel('Capital')
-    ax_p40.set_ylabel('Stake')
-
-    ax_p55.bar(states, stakes_55)
-    ax_p55.set_title('Policy: P_head = 0.55')
-    ax_p55.set_xlabel('Capital')
-    ax_p55.set_ylabel('Stake')
-
-    ax_v.plot(states, values_25, label='P_head = 0.25')
-    ax_v.plot(states, values_40, label='P_head = 0.40')
-    ax_v.plot(states, values_55, label='P_head = 0.55')
+def plot_solutions(solutions, goal=100):
+    """Plot the policy of each solution along with all of the value functions (matplotlib is imported lazily)
+
+    Parameters
+    ----------
+    solutions: dict[float, tuple]
+        A mapping from P_head to the (policy, values) output of `value_iteration_solution`
+    goal: int, optional
+
+    Returns
+    -------
+    matplotlib.pyplot.Figure
+    """
+    import matplotlib.pyplot as plt
+
+    states = range(1, goal)
+    num_plots = len(solutions) + 1
+    num_cols = 2
+    num_rows = (num_plots + num_cols - 1) // num_cols
+    fig, axes = plt.subplots(num_rows, num_cols, squeeze=False)
+    axes = axes.ravel()
+    ax_v = axes[num_plots - 1]
+    for ax in axes[num_plots:]:
+        ax.axis('off')
+
+    for ax_p, (p_head, (policy_fn, value_fn)) in zip(axes, solutions.items()):
+        ax_p.bar(states, [policy_fn[s] for s in states])
+        ax_p.set_title(f'Policy: P_head = {p_head:.2f}')
+        ax_p.set_xlabel('Capital')
+        ax_p.set_ylabel('Stake')
+
+        ax_v.plot(states, [value_fn[s] for s in states], label=f'P_head = {p_head:.2f}')
+
     ax_v.set_title('Value Functions')
     ax_v.set_xlabel('Capital')
     ax_v.set_ylabel('Value Estimates')
 
-    plt.tight_layout()
-    plt.legend()
+    fig.tight_layout()
+    ax_v.legend()
+    return fig
+
+
+if __name__ == '__main__':
+    import matplotlib.pyplot as plt
+
+    solutions = {p_head: value_iteration_solution(CoinFlipEnvironment(p_head)) for p_head in [0.25, 0.4, 0.55]}
+    plot_solutions(solutions)
     plt.show()
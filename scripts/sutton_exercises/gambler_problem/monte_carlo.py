@@ -0,0 +1,218 @@
+"""Batched Monte Carlo simulation of the Gambler's Problem
+
+Plays many gambler episodes in parallel under a fixed policy to check the value function from value iteration.
+
+- The policy is an integer array indexed by capital, holding the stake to make in each state
+- All live episodes are advanced together with one vectorized coin flip per step
+- Finished episodes (capital of $0 or the goal) are compacted out of the working set
+- The estimated probability of winning comes with a Wilson score confidence interval
+"""
+
+import time
+from statistics import NormalDist
+
+import numpy as np
+
+from rl import NULL_TELEMETRY
+
+from main import CoinFlipEnvironment, value_iteration_solution
+
+
+def policy_to_array(policy, goal):
+    """Convert a policy dictionary into an array of stakes indexed by capital
+
+    Parameters
+    ----------
+    policy: dict[int, int]
+        A mapping from capital {1, ..., goal - 1} to the stake made in that state
+    goal: int
+
+    Returns
+    -------
+    numpy.ndarray
+        An integer array of length goal + 1 (the terminal states have a stake of zero)
+    """
+    stakes = np.zeros(goal + 1, dtype=np.int64)
+    for capital, stake in policy.items():
+        stakes[capital] = stake
+    return stakes
+
+
+def simulate_episodes(coin_env, stakes, start_states, max_steps=10000):
+    """Play one gambler episode per start state, all in parallel
+
+    Parameters
+    ----------
+    coin_env: CoinFlipEnvironment
+    stakes: numpy.ndarray
+        The policy as an array of stakes indexed by capital (see `policy_to_array`)
+    start_states: numpy.ndarray
+        The starting capital of each episode
+    max_steps: int, optional
+        Episodes still running after this many coin flips are truncated (e.g. a policy that stakes $0)
+
+    Returns
+    -------
+    numpy.ndarray, numpy.ndarray, numpy.ndarray
+        Boolean arrays marking which episodes were won and which were truncated, along with the episode lengths
+    """
+    stakes = np.asarray(stakes)
+    max_stakes = np.minimum(np.arange(coin_env.goal + 1), coin_env.goal - np.arange(coin_env.goal + 1))
+    assert stakes.shape == (coin_env.goal + 1,), 'The policy must define a stake for every capital!'
+    assert np.all((stakes >= 0) & (stakes <= max_stakes)), 'The policy contains an invalid stake!'
+
+    num_episodes = len(start_states)
+    won = np.zeros(num_episodes, dtype=bool)
+    truncated = np.zeros(num_episodes, dtype=bool)
+    lengths = np.zeros(num_episodes, dtype=np.int64)
+
+    # the working set: the episode IDs and the current capital of every live episode
+    live = np.arange(num_episodes)
+    capital = np.asarray(start_states, dtype=np.int64).copy()
+    for step in range(1, max_steps + 1):
+        if len(live) == 0:
+            break
+
+        # flip a coin for every live episode at once
+        bets = stakes[capital]
+        heads = np.random.rand(len(live)) < coin_env.p_head
+        capital += np.where(heads, bets, -bets)
+
+        # record the finished episodes and compact them out of the working set
+        done = (capital <= 0) | (capital >= coin_env.goal)
+        if done.any():
+            finished = live[done]
+            won[finished] = capital[done] >= coin_env.goal
+            lengths[finished] = step
+            keep = ~done
+            live = live[keep]
+            capital = capital[keep]
+
+    truncated[live] = True
+    lengths[live] = max_steps
+    return won, truncated, lengths
+
+
+def wilson_interval(successes, trials, confidence=0.95):
+    """Wilson score confidence interval for a binomial proportion
+
+    Parameters
+    ----------
+    successes: numpy.ndarray
+    trials: numpy.ndarray
+    confidence: float, optional
+
+    Returns
+    -------
+    numpy.ndarray, numpy.ndarray
+        The lower and upper bounds of the interval
+    """
+    successes = np.asarray(successes, dtype=np.float64)
+    trials = np.asarray(trials, dtype=np.float64)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        p = successes / trials
+        denom = 1 + z ** 2 / trials
+        center = (p + z ** 2 / (2 * trials)) / denom
+        half_width = z * np.sqrt(p * (1 - p) / trials + z ** 2 / (4 * trials ** 2)) / denom
+    return center - half_width, center + half_width
+
+
+def estimate_success_probability(coin_env, stakes, episodes_per_state, chunk_size=1000000,
+                                 confidence=0.95, max_steps=10000, telemetry=None):
+    """Estimate the probability of reaching the goal from every capital under a policy
+
+    Parameters
+    ----------
+    coin_env: CoinFlipEnvironment
+    stakes: numpy.ndarray
+        The policy as an array of stakes indexed by capital (see `policy_to_array`)
+    episodes_per_state: int
+        The number of episodes to play from each capital {1, ..., goal - 1}
+    chunk_size: int, optional
+        The maximum number of episodes simulated in parallel (bounds the memory usage)
+    confidence: float, optional
+        The confidence level of the Wilson score interval
+    max_steps: int, optional
+    telemetry: rl.Telemetry, optional
+        Records the rollout phase along with every simulated chunk
+
+    Returns
+    -------
+    dict[str, numpy.ndarray]
+        The per-capital estimates, confidence interval bounds, and episode counts (indexed by capital)
+    """
+    telemetry = telemetry or NULL_TELEMETRY
+    num_states = coin_env.goal + 1
+    wins = np.zeros(num_states, dtype=np.int64)
+    trials = np.zeros(num_states, dtype=np.int64)
+    truncations = np.zeros(num_states, dtype=np.int64)
+
+    # every capital is repeated `episodes_per_state` times, played out one chunk at a time
+    capitals = np.arange(1, coin_env.goal)
+    total_episodes = len(capitals) * episodes_per_state
+    with telemetry.phase('rollout', episodes=total_episodes):
+        for chunk_idx, chunk_start in enumerate(range(0, total_episodes, chunk_size)):
+            start = time.perf_counter()
+            episode_ids = np.arange(chunk_start, min(chunk_start + chunk_size, total_episodes))
+            start_states = capitals[episode_ids // episodes_per_state]
+            won, truncated, lengths = simulate_episodes(coin_env, stakes, start_states, max_steps=max_steps)
+
+            wins += np.bincount(start_states, weights=won, minlength=num_states).astype(np.int64)
+            trials += np.bincount(start_states, minlength=num_states)
+            truncations += np.bincount(start_states, weights=truncated, minlength=num_states).astype(np.int64)
+            if telemetry.enabled:
+                telemetry.chunk('gambler_monte_carlo', chunk_idx, len(episode_ids), time.perf_counter() - start,
+                                coin_flips=int(lengths.sum()))
+
+    # the terminal states are decided before any coin is flipped
+    estimates = np.zeros(num_states)
+    estimates[1:-1] = wins[1:-1] / trials[1:-1]
+    estimates[-1] = 1
+    lower, upper = wilson_interval(wins, trials, confidence)
+    lower[0], upper[0] = 0, 0
+    lower[-1], upper[-1] = 1, 1
+    return {
+        'estimates': estimates,
+        'lower': lower,
+        'upper': upper,
+        'wins': wins,
+        'trials': trials,
+        'truncations': truncations
+    }
+
+
+def compare_with_value_function(mc_results, values):
+    """Check which states have a value estimate inside the Monte Carlo confidence interval
+
+    Note that value iteration leaves the value of the goal state at zero (the +1 reward is received on entering it),
+    so the goal state is always reported as a success probability of one here.
+
+    Parameters
+    ----------
+    mc_results: dict[str, numpy.ndarray]
+        The output of `estimate_success_probability`
+    values: numpy.ndarray
+        The value function from `value_iteration_solution`
+
+    Returns
+    -------
+    numpy.ndarray
+        A boolean array (indexed by capital) marking the states where the value falls inside the interval
+    """
+    values = np.asarray(values, dtype=np.float64).copy()
+    values[-1] = 1
+    return (mc_results['lower'] <= values) & (values <= mc_results['upper'])
+
+
+if __name__ == '__main__':
+    EPISODES_PER_STATE = 20000
+    for p_head in [0.25, 0.4, 0.55]:
+        env = CoinFlipEnvironment(p_head)
+        policy_fn, value_fn = value_iteration_solution(env)
+        results = estimate_success_probability(env, policy_to_array(policy_fn, env.goal), EPISODES_PER_STATE)
+        inside = compare_with_value_function(results, value_fn)[1:-1]
+        max_error = np.abs(results['estimates'] - value_fn)[1:-1].max()
+        print(f'P_head = {p_head:.2f}: {inside.sum()}/{len(inside)} values inside the 95% interval, '
+              f'max absolute error = {max_error:.4f}')
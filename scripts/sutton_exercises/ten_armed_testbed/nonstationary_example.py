@@ -1,9 +1,12 @@
 """Run the modified ten-armed bandit testbed as specified in exercise 2.5"""
 
-import matplotlib.pyplot as plt
+import time
+
 import numpy as np
 from tqdm import tqdm
 
+from rl import NULL_TELEMETRY, MaxSegmentTree
+
 
 def run_nonstationary_k_arm_bandit(n_steps, n_arms, eps, alpha=None):
     """Run the K-arm bandit problem
@@ -62,12 +65,112 @@ def run_nonstationary_k_arm_bandit(n_steps, n_arms, eps, alpha=None):
     return actions_taken, rewards_received, true_action_vals
 
 
-def run_ten_armed_testbed(n_runs, n_steps, eps, alpha=None):
+def run_many_armed_nonstationary_bandit(n_steps, n_arms, eps, alpha=None, drift=0.01):
+    """Run the nonstationary K-arm bandit problem with a per-step cost that does not grow with the number of arms
+
+    - The value estimates sit in a segment tree: O(log K) update of the selected arm and O(1) greedy selection
+    - The random walk of the true action-values is applied lazily: when an arm is selected, all of the Gaussian
+      steps it missed since it was last touched are drawn at once (the sum of n steps of N(0, drift) is
+      N(0, drift * sqrt(n))), which gives the same distribution as moving every arm on every step
+    - The optimal action (with respect to the final true action-values, as in `run_ten_armed_testbed`) is found once
+      at the end of the run
+
+    Parameters
+    ----------
+    n_steps: int
+    n_arms: int
+    eps: float
+    alpha: float, optional
+        The scaling factor. If left as None, then the scaling factor is defined as a_n(a) = 1/n
+    drift: float, optional
+        The standard deviation of the per-step random walk of the true action-values
+
+    Returns
+    -------
+    A tuple of the actions taken, rewards received, and the optimal action at the end of the run
+    """
+    action_counts = np.zeros(n_arms, dtype=np.int64)
+
+    # sample the true q* value per action from a unit Gaussian, along with the step each one was last moved to
+    true_action_vals = np.random.randn(n_arms)
+    last_moved = np.zeros(n_arms, dtype=np.int64)
+
+    # draw the exploration decisions, random actions, and reward noise for all steps at once
+    explore = np.random.rand(n_steps) < eps
+    random_actions = np.random.randint(0, n_arms, n_steps)
+    reward_noise = np.random.randn(n_steps)
+    walk_noise = np.random.randn(n_steps)
+
+    values = MaxSegmentTree(np.zeros(n_arms))
+    actions_taken = np.empty(n_steps, dtype=np.int64)
+    rewards_received = np.empty(n_steps)
+    for step in range(n_steps):
+        # exploration: choose random action with probability `eps`
+        if explore[step]:
+            action = random_actions[step]
+        # exploitation: select the action with the highest current estimated value
+        else:
+            action = values.argmax()
+
+        # catch up on the noise added to the true value of this action since it was last moved
+        missed_steps = step + 1 - last_moved[action]
+        true_action_vals[action] += drift * np.sqrt(missed_steps) * walk_noise[step]
+        last_moved[action] = step + 1
+
+        # sample the reward from this selected action
+        curr_reward = true_action_vals[action] + reward_noise[step]
+
+        # update the action count
+        action_counts[action] += 1
+        n = action_counts[action]
+
+        # calculate the scaling factor if it is None
+        alpha_val = (1 / n) if alpha is None else alpha
+
+        # update the value estimate of the selected action only
+        q_n = values[action]
+        values.update(action, q_n + alpha_val * (curr_reward - q_n))
+
+        actions_taken[step] = action
+        rewards_received[step] = curr_reward
+
+    # bring every action up to date once to find the final optimal action
+    true_action_vals += drift * np.sqrt(n_steps - last_moved) * np.random.randn(n_arms)
+    return actions_taken, rewards_received, true_action_vals.argmax()
+
+
+def run_many_armed_testbed(n_runs, n_steps, eps, n_arms, alpha=None, telemetry=None):
+    """Run the nonstationary many-armed bandit problem several times
+
+    The true action-values are not returned (they would take n_runs * n_arms memory), only the optimal actions.
+
+    Returns
+    -------
+    A tuple of the actions taken and rewards received (n_runs, n_steps), and the optimal action of each run
+    """
+    telemetry = telemetry or NULL_TELEMETRY
+    actions = np.empty((n_runs, n_steps), dtype=np.int64)
+    rewards = np.empty((n_runs, n_steps))
+    optimal_actions = np.empty(n_runs, dtype=np.int64)
+    for run in tqdm(range(n_runs), desc=f'Running {n_arms} arms for epsilon = {eps}'):
+        start = time.perf_counter()
+        actions[run], rewards[run], optimal_actions[run] = run_many_armed_nonstationary_bandit(
+            n_steps, n_arms, eps, alpha=alpha)
+        if telemetry.enabled:
+            telemetry.chunk('many_armed_testbed', run, n_steps, time.perf_counter() - start, eps=eps, n_arms=n_arms)
+    return actions, rewards, optimal_actions
+
+
+def run_ten_armed_testbed(n_runs, n_steps, eps, alpha=None, telemetry=None, n_arms=10):
+    telemetry = telemetry or NULL_TELEMETRY
     actions = []
     rewards = []
     true_action_values = []
-    for _ in tqdm(range(n_runs), desc=f'Running for epsilon = {eps}'):
-        a, r, tav = run_nonstationary_k_arm_bandit(n_steps=n_steps, n_arms=10, eps=eps, alpha=alpha)
+    for run in tqdm(range(n_runs), desc=f'Running for epsilon = {eps}'):
+        start = time.perf_counter()
+        a, r, tav = run_nonstationary_k_arm_bandit(n_steps=n_steps, n_arms=n_arms, eps=eps, alpha=alpha)
+        if telemetry.enabled:
+            telemetry.chunk('ten_armed_testbed', run, n_steps, time.perf_counter() - start, eps=eps)
         actions.append(a)
         rewards.append(r)
         true_action_values.append(tav)
@@ -77,34 +180,88 @@ def run_ten_armed_testbed(n_runs, n_steps, eps, alpha=None):
     return actions, rewards, true_action_values
 
 
-def main(n_runs=2000, n_steps=10000):
-    # run the experiments (stationary vs nonstationary)
-    actions_s, rewards_s, true_values_s = run_ten_armed_testbed(n_runs, n_steps, eps=0.1, alpha=None)
-    actions_n, rewards_n, true_values_n = run_ten_armed_testbed(n_runs, n_steps, eps=0.1, alpha=0.1)
+# the step size settings compared in exercise 2.5 along with their plot labels
+# (the average reward labels and the optimal action labels)
+ALPHA_SETTINGS = [
+    (None, 'Stationary (a=1/n)', 'Sample-average (a=1/n)'),
+    (0.1, 'Nonstationary (a=0.1)', 'Constant step size (a=0.1)')
+]
 
-    fig, (ax1, ax2) = plt.subplots(2, 1)
 
-    # first plot: average reward over time
-    mean_reward_per_step_s = rewards_s.mean(axis=0)
-    mean_reward_per_step_n = rewards_n.mean(axis=0)
-    ax1.plot(range(n_steps), mean_reward_per_step_s, label='Stationary (a=1/n)')
-    ax1.plot(range(n_steps), mean_reward_per_step_n, label='Nonstationary (a=0.1)')
-    ax1.set_xlabel('Steps')
-    ax1.set_ylabel('Average reward')
+def run_experiments(n_runs=2000, n_steps=10000, eps=0.1, telemetry=None, n_arms=10, many_armed=False):
+    """Run the testbed once per step size setting
+
+    Set `many_armed` to use the many-armed testbed, whose step cost does not grow with `n_arms`.
+
+    Returns
+    -------
+    dict[float, tuple]
+        A mapping from alpha (None for the sample-average) to the actions, rewards, and optimal action of each run
+    """
+    results = {}
+    for alpha, *_ in ALPHA_SETTINGS:
+        if many_armed:
+            results[alpha] = run_many_armed_testbed(n_runs, n_steps, eps, n_arms, alpha=alpha, telemetry=telemetry)
+        else:
+            actions, rewards, true_values = run_ten_armed_testbed(n_runs, n_steps, eps=eps, alpha=alpha,
+                                                                  telemetry=telemetry, n_arms=n_arms)
+            results[alpha] = actions, rewards, true_values.argmax(axis=1)
+    return results
+
+
+def summarize_results(results):
+    """Compute the average reward and the fraction of optimal actions per step of every step size setting
+
+    Returns
+    -------
+    dict[float, numpy.ndarray], dict[float, numpy.ndarray]
+    """
+    mean_rewards = {}
+    optimal_fractions = {}
+    for alpha, (actions, rewards, optimal_actions) in results.items():
+        mean_rewards[alpha] = rewards.mean(axis=0)
+        optimal_fractions[alpha] = (actions == optimal_actions.reshape(-1, 1)).sum(axis=0) / actions.shape[0]
+    return mean_rewards, optimal_fractions
+
+
+def plot_results(mean_rewards, optimal_fractions):
+    """Plot the average reward and the percentage of optimal actions per step (matplotlib is imported lazily)
 
-    # second plot: optimal actions per step
-    optimal_actions_s = true_values_s.argmax(axis=1).reshape(-1, 1)
-    optimal_actions_n = true_values_n.argmax(axis=1).reshape(-1, 1)
+    Parameters
+    ----------
+    mean_rewards: dict[float, numpy.ndarray]
+        The average reward per step of every step size setting (see `summarize_results`)
+    optimal_fractions: dict[float, numpy.ndarray]
+        The fraction of optimal actions per step of every step size setting
 
-    percent_optimal_actions_0 = (actions_s == optimal_actions_s).sum(axis=0) / actions_s.shape[0]
-    percent_optimal_actions_1p = (actions_n == optimal_actions_n).sum(axis=0) / actions_n.shape[0]
+    Returns
+    -------
+    matplotlib.pyplot.Figure
+    """
+    import matplotlib.pyplot as plt
 
-    ax2.plot(range(n_steps), percent_optimal_actions_0, label='Sample-average (a=1/n)')
-    ax2.plot(range(n_steps), percent_optimal_actions_1p, label='Constant step size (a=0.1)')
+    fig, (ax1, ax2) = plt.subplots(2, 1)
+    for alpha, reward_label, optimal_label in ALPHA_SETTINGS:
+        # first plot: average reward over time
+        ax1.plot(range(len(mean_rewards[alpha])), mean_rewards[alpha], label=reward_label)
+
+        # second plot: optimal actions per step
+        ax2.plot(range(len(optimal_fractions[alpha])), optimal_fractions[alpha], label=optimal_label)
+
+    ax1.set_xlabel('Steps')
+    ax1.set_ylabel('Average reward')
     ax2.set_xlabel('Steps')
     ax2.set_ylabel('% Optimal action')
+    ax2.legend()
+    return fig
 
-    plt.legend()
+
+def main(n_runs=2000, n_steps=10000):
+    import matplotlib.pyplot as plt
+
+    # run the experiments (stationary vs nonstationary)
+    results = run_experiments(n_runs, n_steps)
+    plot_results(*summarize_results(results))
     plt.show()
 
 
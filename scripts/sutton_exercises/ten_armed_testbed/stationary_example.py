@@ -1,9 +1,12 @@
 """Run 2000 10-arm bandit problems with the sample-average action-value method"""
 
-import matplotlib.pyplot as plt
+import time
+
 import numpy as np
 from tqdm import tqdm
 
+from rl import NULL_TELEMETRY, MaxSegmentTree
+
 
 def run_k_arm_bandit(n_steps, n_arms, eps):
     reward_total_per_action = np.zeros(n_arms)
@@ -38,12 +41,88 @@ def run_k_arm_bandit(n_steps, n_arms, eps):
     return actions_taken, rewards_received, true_action_vals
 
 
-def run_ten_armed_testbed(n_runs, n_steps, eps):
+def run_many_armed_bandit(n_steps, n_arms, eps):
+    """Run the K-arm bandit problem with a per-step cost that does not grow with the number of arms
+
+    - The value estimates sit in a segment tree: O(log K) update of the selected arm and O(1) greedy selection
+    - Only the reward of the selected arm is sampled (instead of pre-sampling every arm for every step)
+    - The exploration draws are made for all steps at once
+    - The optimal arm is fixed (stationary problem), so it is found once instead of checking every arm on every step
+
+    Parameters
+    ----------
+    n_steps: int
+    n_arms: int
+    eps: float
+
+    Returns
+    -------
+    A tuple of the actions taken, rewards received, and the optimal action
+    """
+    reward_total_per_action = np.zeros(n_arms)
+    action_counts = np.zeros(n_arms, dtype=np.int64)
+
+    # sample the true q* value per action from a unit Gaussian
+    true_action_vals = np.random.randn(n_arms)
+    optimal_action = true_action_vals.argmax()
+
+    # draw the exploration decisions, random actions, and reward noise for all steps at once
+    explore = np.random.rand(n_steps) < eps
+    random_actions = np.random.randint(0, n_arms, n_steps)
+    reward_noise = np.random.randn(n_steps)
+
+    values = MaxSegmentTree(np.zeros(n_arms))
+    actions_taken = np.empty(n_steps, dtype=np.int64)
+    rewards_received = np.empty(n_steps)
+    for step in range(n_steps):
+        if explore[step]:  # exploration: choose random action with probability `eps`
+            action = random_actions[step]
+        else:  # exploitation: select the action with the highest current estimated value
+            action = values.argmax()
+        curr_reward = true_action_vals[action] + reward_noise[step]
+
+        actions_taken[step] = action
+        rewards_received[step] = curr_reward
+
+        # update the value estimate of the selected action only
+        reward_total_per_action[action] += curr_reward
+        action_counts[action] += 1
+        values.update(action, reward_total_per_action[action] / action_counts[action])
+
+    return actions_taken, rewards_received, optimal_action
+
+
+def run_many_armed_testbed(n_runs, n_steps, eps, n_arms, telemetry=None):
+    """Run the many-armed bandit problem several times
+
+    The true action-values are not returned (they would take n_runs * n_arms memory), only the optimal actions.
+
+    Returns
+    -------
+    A tuple of the actions taken and rewards received (n_runs, n_steps), and the optimal action of each run
+    """
+    telemetry = telemetry or NULL_TELEMETRY
+    actions = np.empty((n_runs, n_steps), dtype=np.int64)
+    rewards = np.empty((n_runs, n_steps))
+    optimal_actions = np.empty(n_runs, dtype=np.int64)
+    for run in tqdm(range(n_runs), desc=f'Running {n_arms} arms for epsilon = {eps}'):
+        start = time.perf_counter()
+        actions[run], rewards[run], optimal_actions[run] = run_many_armed_bandit(n_steps, n_arms, eps)
+        if telemetry.enabled:
+            telemetry.chunk('many_armed_testbed', run, n_steps, time.perf_counter() - start, eps=eps, n_arms=n_arms)
+    return actions, rewards, optimal_actions
+
+
+def run_ten_armed_testbed(n_runs, n_steps, eps, telemetry=None, n_arms=10):
+    telemetry = telemetry or NULL_TELEMETRY
     actions = []
     rewards = []
     true_action_values = []
-    for _ in tqdm(range(n_runs), desc=f'Running for epsilon = {eps}'):
-        a, r, tav = run_k_arm_bandit(n_steps=n_steps, n_arms=10, eps=eps)
+    for run in tqdm(range(n_runs), desc=f'Running for epsilon = {eps}'):
+        start = time.perf_counter()
+        a, r, tav = run_k_arm_bandit(n_steps=n_steps, n_arms=n_arms, eps=eps)
+        if telemetry.enabled:
+            telemetry.chunk('ten_armed_testbed', run, n_steps, time.perf_counter() - start, eps=eps)
         actions.append(a)
         rewards.append(r)
         true_action_values.append(tav)
@@ -53,40 +132,87 @@ def run_ten_armed_testbed(n_runs, n_steps, eps):
     return actions, rewards, true_action_values
 
 
-def main(n_runs=2000, n_steps=1000):
-    # run the experiments
-    actions_0, rewards_0, true_values_0 = run_ten_armed_testbed(n_runs, n_steps, 0)
-    actions_1p, rewards_1p, true_values_1p = run_ten_armed_testbed(n_runs, n_steps, 0.01)
-    actions_10p, rewards_10p, true_values_10p = run_ten_armed_testbed(n_runs, n_steps, 0.1)
+# the epsilon settings compared in Figure 2.2 along with their plot labels and colors
+EPS_SETTINGS = [
+    (0, 'Eps=0 (greedy)', 'green'),
+    (0.01, 'Eps=0.01', 'red'),
+    (0.1, 'Eps=0.1', 'blue')
+]
+
+
+def run_experiments(n_runs=2000, n_steps=1000, telemetry=None, n_arms=10, many_armed=False):
+    """Run the testbed once per epsilon setting
+
+    Set `many_armed` to use the many-armed testbed, whose step cost does not grow with `n_arms`.
+
+    Returns
+    -------
+    dict[float, tuple]
+        A mapping from epsilon to the actions, rewards, and optimal action of each run
+    """
+    results = {}
+    for eps, *_ in EPS_SETTINGS:
+        if many_armed:
+            results[eps] = run_many_armed_testbed(n_runs, n_steps, eps, n_arms, telemetry=telemetry)
+        else:
+            actions, rewards, true_values = run_ten_armed_testbed(n_runs, n_steps, eps, telemetry=telemetry,
+                                                                  n_arms=n_arms)
+            results[eps] = actions, rewards, true_values.argmax(axis=1)
+    return results
+
+
+def summarize_results(results):
+    """Compute the average reward and the fraction of optimal actions per step of every epsilon setting
+
+    Returns
+    -------
+    dict[float, numpy.ndarray], dict[float, numpy.ndarray]
+    """
+    mean_rewards = {}
+    optimal_fractions = {}
+    for eps, (actions, rewards, optimal_actions) in results.items():
+        mean_rewards[eps] = rewards.mean(axis=0)
+        optimal_fractions[eps] = (actions == optimal_actions.reshape(-1, 1)).sum(axis=0) / actions.shape[0]
+    return mean_rewards, optimal_fractions
+
+
+def plot_results(mean_rewards, optimal_fractions):
+    """Plot the average reward and the percentage of optimal actions per step (matplotlib is imported lazily)
+
+    Parameters
+    ----------
+    mean_rewards: dict[float, numpy.ndarray]
+        The average reward per step of every epsilon setting (see `summarize_results`)
+    optimal_fractions: dict[float, numpy.ndarray]
+        The fraction of optimal actions per step of every epsilon setting
+
+    Returns
+    -------
+    matplotlib.pyplot.Figure
+    """
+    import matplotlib.pyplot as plt
 
     fig, (ax1, ax2) = plt.subplots(2, 1)
+    for eps, label, color in EPS_SETTINGS:
+        # first plot: average reward over time
+        ax1.plot(range(len(mean_rewards[eps])), mean_rewards[eps], color=color, label=label)
+
+        # second plot: optimal actions per step
+        ax2.plot(range(len(optimal_fractions[eps])), optimal_fractions[eps], color=color, label=label)
 
-    # first plot: average reward over time
-    mean_reward_per_step_0 = rewards_0.mean(axis=0)
-    mean_reward_per_step_1p = rewards_1p.mean(axis=0)
-    mean_reward_per_step_10p = rewards_10p.mean(axis=0)
-    ax1.plot(range(n_steps), mean_reward_per_step_0, color='green', label='Eps=0 (greedy)')
-    ax1.plot(range(n_steps), mean_reward_per_step_1p, color='red', label='Eps=0.01')
-    ax1.plot(range(n_steps), mean_reward_per_step_10p, color='blue', label='Eps=0.1')
     ax1.set_xlabel('Steps')
     ax1.set_ylabel('Average reward')
-
-    # second plot: optimal actions per step
-    optimal_actions_0 = true_values_0.argmax(axis=1).reshape(-1, 1)
-    optimal_actions_1p = true_values_1p.argmax(axis=1).reshape(-1, 1)
-    optimal_actions_10p = true_values_10p.argmax(axis=1).reshape(-1, 1)
-
-    percent_optimal_actions_0 = (actions_0 == optimal_actions_0).sum(axis=0) / actions_0.shape[0]
-    percent_optimal_actions_1p = (actions_1p == optimal_actions_1p).sum(axis=0) / actions_1p.shape[0]
-    percent_optimal_actions_10p = (actions_10p == optimal_actions_10p).sum(axis=0) / actions_10p.shape[0]
-
-    ax2.plot(range(n_steps), percent_optimal_actions_0, color='green', label='Eps=0 (greedy)')
-    ax2.plot(range(n_steps), percent_optimal_actions_1p, color='red', label='Eps=0.01')
-    ax2.plot(range(n_steps), percent_optimal_actions_10p, color='blue', label='Eps=0.1')
     ax2.set_xlabel('Steps')
     ax2.set_ylabel('% Optimal action')
+    ax2.legend()
+    return fig
+
+
+def main(n_runs=2000, n_steps=1000):
+    import matplotlib.pyplot as plt
 
-    plt.legend()
+    results = run_experiments(n_runs, n_steps)
+    plot_results(*summarize_results(results))
     plt.show()
 
 
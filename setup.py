@@ -4,4 +4,13 @@ setup(
     name='rl',
     version='0.1dev',
     packages=find_packages(),
+    install_requires=['numpy', 'scipy', 'tqdm'],
+    extras_require={'plot': ['matplotlib']},
+    entry_points={
+        'console_scripts': [
+            'rl-experiments=rl.cli:main',
+            'rl-benchmarks=rl.benchmarks:main',
+            'rl-maze-service=rl.service:main',
+        ],
+    },
 )